@@ -1,7 +1,7 @@
 {
     'name': 'Learning Agreement Demo',
     'summary': 'Learning Agreement workflow: student portal form, coordinator fields, document generation, signatures, reminders, and chat',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'category': 'Education',
     'author': 'Project Setup by Assistant',
     'website': 'https://example.com',
@@ -22,7 +22,10 @@
         'data/ir_sequence.xml',
         'views/menus.xml',
         'views/learning_agreement_views.xml',
+        'views/learning_agreement_report_views.xml',
+        'views/learning_agreement_metric_views.xml',
         'views/res_config_settings_views.xml',
+        'wizard/learning_agreement_import_views.xml',
         'views/portal_templates.xml',
         'views/portal_assets.xml',
         'report/learning_agreement_report.xml',
@@ -30,5 +33,8 @@
         'data/ir_cron.xml'
     ],
     'assets': {
+        'web.assets_frontend': [
+            'sm_learning_agreement/static/src/js/portal_learning_agreement.js',
+        ],
     },
 }
\ No newline at end of file
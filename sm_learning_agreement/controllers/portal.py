@@ -1,64 +1,235 @@
 from odoo import http, _
 from odoo.http import request
-from odoo.addons.portal.controllers.portal import CustomerPortal
+from odoo.addons.portal.controllers.portal import CustomerPortal, pager as portal_pager
+from odoo.addons.sm_learning_agreement.models.learning_agreement import PORTAL_WRITABLE_FIELDS
+from odoo.addons.sm_learning_agreement.models.learning_agreement_metric import instrumented
+from collections import OrderedDict
+from werkzeug.exceptions import TooManyRequests
+import threading
+import time
+
+
+class _FailureRateLimiter:
+	"""In-memory count of failed token checks per key over a fixed window.
+
+	Bounded to ``max_keys`` entries with least-recently-used eviction. Each
+	worker process keeps its own counts.
+	"""
+
+	def __init__(self, max_failures=20, window=300, max_keys=10000):
+		self.max_failures = max_failures
+		self.window = window
+		self.max_keys = max_keys
+		self._entries = OrderedDict()
+		self._lock = threading.Lock()
+
+	def is_blocked(self, key):
+		with self._lock:
+			entry = self._entries.get(key)
+			if not entry:
+				return False
+			started, count = entry
+			if time.monotonic() - started > self.window:
+				del self._entries[key]
+				return False
+			self._entries.move_to_end(key)
+			return count >= self.max_failures
+
+	def register_failure(self, key):
+		with self._lock:
+			now = time.monotonic()
+			started, count = self._entries.get(key, (now, 0))
+			if now - started > self.window:
+				started, count = now, 0
+			self._entries[key] = (started, count + 1)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.max_keys:
+				self._entries.popitem(last=False)
+
+
+_token_rate_limiter = _FailureRateLimiter()
 
 
 class PortalLearningAgreement(CustomerPortal):
 	def _get_agreement(self, agreement_id, access_token=None, allow_portal_owner=True):
-		agreement = request.env['learning.agreement'].sudo().browse(int(agreement_id))
-		if not agreement.exists():
-			raise http.NotFound()
-		# Token access
-		if access_token and access_token == agreement.access_token:
-			return agreement
-		# Portal owner access
+		agreement_id = int(agreement_id)
+		Agreement = request.env['learning.agreement'].sudo()
+		# Portal owner access, never rate limited
 		if allow_portal_owner and request.env.user.has_group('base.group_portal'):
-			if agreement.student_partner_id.id == request.env.user.partner_id.id:
-				return agreement
+			if Agreement.with_context(active_test=False).search_count([
+				('id', '=', agreement_id),
+				('student_partner_id', '=', request.env.user.partner_id.id),
+			], limit=1):
+				return self._check_agreement_active(Agreement.browse(agreement_id))
+		if not access_token:
+			raise http.SessionExpiredException(_('You do not have access to this agreement.'))
+		# Token access, limited per client address to slow down token guessing
+		rate_key = f"ip:{request.httprequest.remote_addr}"
+		if _token_rate_limiter.is_blocked(rate_key):
+			raise TooManyRequests()
+		if Agreement._get_id_from_access_token(agreement_id, access_token):
+			return self._check_agreement_active(Agreement.browse(agreement_id))
+		_token_rate_limiter.register_failure(rate_key)
 		raise http.SessionExpiredException(_('You do not have access to this agreement.'))
 
-	@http.route(['/my/learning-agreements'], type='http', auth='user', website=True)
-	def portal_my_learning_agreements(self, **kwargs):
-		partner = request.env.user.partner_id
-		agreements = request.env['learning.agreement'].sudo().search([('student_partner_id', '=', partner.id)])
+	def _check_agreement_active(self, agreement):
+		# Archived agreements are gone for whoever may access them; others
+		# are only told they have no access
+		if not agreement.active:
+			raise http.NotFound()
+		return agreement
+
+	def _get_learning_agreements_domain(self):
+		return [('student_partner_id', '=', request.env.user.partner_id.id)]
+
+	def _prepare_home_portal_values(self, counters):
+		values = super()._prepare_home_portal_values(counters)
+		if 'learning_agreement_count' in counters:
+			values['learning_agreement_count'] = request.env['learning.agreement'].sudo().search_count(
+				self._get_learning_agreements_domain())
+		return values
+
+	@http.route(['/my/learning-agreements', '/my/learning-agreements/page/<int:page>'], type='http', auth='user', website=True)
+	@instrumented('portal_my_learning_agreements', persist=False)
+	def portal_my_learning_agreements(self, page=1, sortby=None, filterby=None, **kwargs):
+		Agreement = request.env['learning.agreement'].sudo()
+		searchbar_sortings = {
+			'date': {'label': _('Newest'), 'order': 'create_date desc, id desc'},
+			'name': {'label': _('Reference'), 'order': 'name, id'},
+			'state': {'label': _('Status'), 'order': 'state, id desc'},
+		}
+		searchbar_filters = {
+			'all': {'label': _('All'), 'domain': []},
+			'to_fill': {'label': _('To Fill In'), 'domain': [('state', 'in', ('draft', 'student_input'))]},
+			'to_sign': {'label': _('To Sign'), 'domain': [('state', '=', 'sent')]},
+			'signed': {'label': _('Signed'), 'domain': [('state', '=', 'signed')]},
+		}
+		sortby = sortby if sortby in searchbar_sortings else 'date'
+		filterby = filterby if filterby in searchbar_filters else 'all'
+		domain = self._get_learning_agreements_domain() + searchbar_filters[filterby]['domain']
+
+		pager = portal_pager(
+			url='/my/learning-agreements',
+			url_args={'sortby': sortby, 'filterby': filterby},
+			total=Agreement.search_count(domain),
+			page=page,
+			step=self._items_per_page,
+		)
+		agreements = Agreement.search(domain, order=searchbar_sortings[sortby]['order'],
+									  limit=self._items_per_page, offset=pager['offset'])
+		# Prefetch everything the template reads in two queries
+		agreements.fetch(['name', 'state', 'signature_status', 'coordinator_partner_id'])
+		agreements.coordinator_partner_id.fetch(['name'])
 		values = {
 			'page_name': 'learning_agreements',
 			'agreements': agreements,
+			'pager': pager,
+			'default_url': '/my/learning-agreements',
+			'searchbar_sortings': searchbar_sortings,
+			'sortby': sortby,
+			'searchbar_filters': searchbar_filters,
+			'filterby': filterby,
 		}
 		return request.render('sm_learning_agreement.portal_my_agreements', values)
 
+	def _prepare_green_values(self, post):
+		# Keep only green fields
+		vals = {}
+		for key in PORTAL_WRITABLE_FIELDS:
+			if key in post and post.get(key) != '':
+				vals[key] = post.get(key)
+		# Handle country as Many2one id
+		if 'student_country_id' in vals:
+			try:
+				vals['student_country_id'] = int(vals['student_country_id'])
+			except Exception:
+				vals.pop('student_country_id', None)
+		return vals
+
+	def _post_agreement_message(self, agreement, body):
+		# Messages sent through the token link are authored by the student
+		author_id = agreement.student_partner_id.id if request.env.user._is_public() else None
+		return agreement.sudo().message_post(
+			body=body,
+			author_id=author_id,
+			message_type='comment',
+			subtype_xmlid='mail.mt_comment',
+		)
+
+	def _get_agreement_messages(self, agreement, after_id=0):
+		"""Return the public comments of ``agreement``: tracking values,
+		notifications and internal notes are not shown to the student."""
+		return request.env['mail.message'].sudo().search([
+			('model', '=', agreement._name),
+			('res_id', '=', agreement.id),
+			('message_type', '=', 'comment'),
+			('subtype_id.internal', '=', False),
+			('id', '>', int(after_id or 0)),
+		], order='id')
+
+	def _serialize_messages(self, messages):
+		return [{
+			'id': message.id,
+			'author': message.author_id.name or _('System'),
+			'date': message.date and message.date.strftime('%Y-%m-%d %H:%M') or '',
+			'body': str(message.body or ''),
+		} for message in messages]
+
 	@http.route(['/my/learning-agreement/<int:agreement_id>'], type='http', auth='public', website=True, csrf=False)
+	@instrumented('portal_learning_agreement_form', persist=False)
 	def portal_learning_agreement_form(self, agreement_id, **post):
 		access_token = post.get('access_token') or request.params.get('access_token')
 		agreement = self._get_agreement(agreement_id, access_token=access_token, allow_portal_owner=True)
 		if request.httprequest.method == 'POST' and post:
-			# Update only green fields
-			allowed_fields = {
-				'student_full_name', 'student_email', 'student_phone', 'student_street', 'student_street2', 'student_zip', 'student_city', 'student_country_id'
-			}
-			vals = {}
-			for key in allowed_fields:
-				if key in post and post.get(key) != '':
-					vals[key] = post.get(key)
-			# Handle country as Many2one id
-			if 'student_country_id' in vals:
-				try:
-					vals['student_country_id'] = int(vals['student_country_id'])
-				except Exception:
-					vals.pop('student_country_id', None)
-			agreement.sudo().write(vals)
+			agreement.sudo().write(self._prepare_green_values(post))
 			return request.redirect(f"/my/learning-agreement/{agreement_id}?access_token={agreement.access_token}")
 		values = {
 			'agreement': agreement,
 			'access_token': access_token or agreement.access_token,
+			'messages': self._get_agreement_messages(agreement),
 		}
 		return request.render('sm_learning_agreement.portal_learning_agreement_form', values)
 
 	@http.route(['/my/learning-agreement/<int:agreement_id>/message'], type='http', auth='public', website=True, csrf=False, methods=['POST'])
+	@instrumented('portal_learning_agreement_message', persist=False)
 	def portal_learning_agreement_message(self, agreement_id, **post):
 		access_token = post.get('access_token') or request.params.get('access_token')
 		agreement = self._get_agreement(agreement_id, access_token=access_token, allow_portal_owner=True)
 		body = (post.get('message') or '').strip()
 		if body:
-			agreement.sudo().message_post(body=body)
-		return request.redirect(f"/my/learning-agreement/{agreement_id}?access_token={agreement.access_token}")
\ No newline at end of file
+			self._post_agreement_message(agreement, body)
+		return request.redirect(f"/my/learning-agreement/{agreement_id}?access_token={agreement.access_token}")
+
+	# Asynchronous endpoints used by the portal form widget
+
+	@http.route(['/my/learning-agreement/<int:agreement_id>/save'], type='json', auth='public', website=True)
+	@instrumented('portal_learning_agreement_save', persist=False)
+	def portal_learning_agreement_save(self, agreement_id, access_token=None, values=None):
+		agreement = self._get_agreement(agreement_id, access_token=access_token, allow_portal_owner=True)
+		vals = self._prepare_green_values(values or {})
+		# Write only the fields that actually changed
+		changed = {}
+		for fname, value in vals.items():
+			current = agreement[fname]
+			current = current.id if fname == 'student_country_id' else (current or '')
+			if value != current:
+				changed[fname] = value
+		if changed:
+			agreement.sudo().write(changed)
+		return {'changed': sorted(changed)}
+
+	@http.route(['/my/learning-agreement/<int:agreement_id>/chat/post'], type='json', auth='public', website=True)
+	@instrumented('portal_learning_agreement_chat_post', persist=False)
+	def portal_learning_agreement_chat_post(self, agreement_id, access_token=None, message=None):
+		agreement = self._get_agreement(agreement_id, access_token=access_token, allow_portal_owner=True)
+		body = (message or '').strip()
+		if not body:
+			return {'messages': []}
+		return {'messages': self._serialize_messages(self._post_agreement_message(agreement, body))}
+
+	@http.route(['/my/learning-agreement/<int:agreement_id>/chat/fetch'], type='json', auth='public', website=True)
+	@instrumented('portal_learning_agreement_chat_fetch', persist=False)
+	def portal_learning_agreement_chat_fetch(self, agreement_id, access_token=None, after_id=0):
+		agreement = self._get_agreement(agreement_id, access_token=access_token, allow_portal_owner=True)
+		messages = self._get_agreement_messages(agreement, after_id=after_id)
+		return {'messages': self._serialize_messages(messages)}
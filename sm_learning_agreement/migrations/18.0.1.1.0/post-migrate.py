@@ -0,0 +1,19 @@
+from odoo import SUPERUSER_ID, api
+
+
+def migrate(cr, version):
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    # Agreements sent before the reminder schedule existed get their first date
+    cr.execute("""
+        UPDATE learning_agreement
+           SET reminder_next_date = (signature_sent_date + interval '7 days')::date,
+               reminder_count = 0
+         WHERE state = 'sent'
+           AND reminder_next_date IS NULL
+           AND signature_sent_date IS NOT NULL
+    """)
+    # The reminder cron is declared noupdate: it now runs daily and only
+    # handles the agreements that are due
+    cron = env.ref('sm_learning_agreement.ir_cron_learning_agreement_signature_reminder', raise_if_not_found=False)
+    if cron:
+        cron.write({'interval_number': 1, 'interval_type': 'days'})
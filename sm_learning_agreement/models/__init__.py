@@ -1,2 +1,7 @@
 from . import learning_agreement
-from . import res_config_settings
\ No newline at end of file
+from . import learning_agreement_audit
+from . import learning_agreement_job
+from . import learning_agreement_metric
+from . import learning_agreement_report
+from . import res_config_settings
+from . import sign_request
\ No newline at end of file
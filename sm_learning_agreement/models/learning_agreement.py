@@ -1,8 +1,98 @@
-from odoo import api, fields, models, _, exceptions
+from odoo import api, fields, models, tools, _, exceptions
 from odoo.exceptions import AccessError, UserError
-from datetime import timedelta
+from odoo.tools import consteq, is_html_empty
+from odoo.tools.sql import create_index
+from datetime import date, datetime, timedelta
+from lxml import etree
+from .learning_agreement_metric import current_span, instrumented
 import base64
+import hashlib
+import json
+import logging
 import secrets
+import threading
+
+_logger = logging.getLogger(__name__)
+
+# Green fields: the only fields students may write, from the portal or the backend
+PORTAL_WRITABLE_FIELDS = frozenset({
+    'student_full_name',
+    'student_email',
+    'student_phone',
+    'student_street',
+    'student_street2',
+    'student_zip',
+    'student_city',
+    'student_country_id',
+})
+
+# sign.request states mapped onto agreement states
+SIGN_DONE_STATES = ('signed', 'completed', 'done')
+SIGN_CANCEL_STATES = ('cancel', 'canceled')
+
+# Signature boxes on the first page of the contract:
+# (role name, role sequence, item label, horizontal position)
+SIGN_LAYOUT = (
+    ('Student', 10, 'Student Signature', 0.10),
+    ('Coordinator', 20, 'Coordinator Signature', 0.60),
+)
+
+REPORT_XMLID = 'sm_learning_agreement.action_report_learning_agreement'
+# Agreements rendered per wkhtmltopdf pass, and per background run
+RENDER_CHUNK_SIZE = 50
+RENDER_BATCH_LIMIT = 500
+RENDER_STALE_DELAY = timedelta(hours=1)
+# QWeb views of the contract and the values they print; both feed the render
+# cache key so a change to either invalidates the stored PDF
+REPORT_VIEW_XMLIDS = (
+    'sm_learning_agreement.report_learning_agreement',
+    'sm_learning_agreement.report_learning_agreement_document',
+    'web.external_layout',
+)
+# Company values printed in the header and footer of the external layout
+REPORT_COMPANY_FIELDS = (
+    'name', 'logo', 'street', 'street2', 'zip', 'city', 'country_id', 'phone', 'email', 'website',
+    'vat', 'company_registry', 'company_details', 'report_header', 'report_footer',
+    'external_report_layout_id', 'paperformat_id', 'layout_background', 'font', 'primary_color', 'secondary_color',
+)
+REPORT_HASH_FIELDS = (
+    'name',
+    'student_partner_id.name', 'student_partner_id.email', 'coordinator_partner_id.name',
+    'student_full_name', 'student_email', 'student_phone',
+    'student_street', 'student_street2', 'student_zip', 'student_city', 'student_country_id.name',
+    'mobility_start_date', 'mobility_end_date', 'learning_outcomes',
+    'host_org_name', 'host_org_street', 'host_org_street2', 'host_org_zip', 'host_org_city', 'host_org_country_id.name',
+    'host_responsible_name', 'host_responsible_email', 'host_responsible_phone',
+)
+
+REMINDER_SCHEDULE_PARAM = 'sm_learning_agreement.reminder_schedule'
+REMINDER_BATCH_LIMIT_PARAM = 'sm_learning_agreement.reminder_batch_limit'
+DEFAULT_REMINDER_SCHEDULE = (7, 7, 14)
+DEFAULT_REMINDER_BATCH_LIMIT = 200
+
+# 'full': standard mail tracking; 'audit': one learning.agreement.audit entry per write
+TRACKING_MODE_PARAM = 'sm_learning_agreement.tracking_mode'
+
+ARCHIVE_RETENTION_PARAM = 'sm_learning_agreement.archive_retention_days'
+DEFAULT_ARCHIVE_RETENTION_DAYS = 365
+ARCHIVE_BATCH_LIMIT = 1000
+ARCHIVE_CHUNK_SIZE = 100
+
+SYNC_WATERMARK_PARAM = 'sm_learning_agreement.sign_sync_watermark'
+SYNC_FAILED_IDS_PARAM = 'sm_learning_agreement.sign_sync_failed_ids'
+SYNC_CHUNK_SIZE = 500
+# Overlap with the previous run so requests committed late by concurrent
+# transactions are still reconciled
+SYNC_LOOKBACK = timedelta(hours=1)
+
+
+def hash_access_token(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _auto_commit_enabled():
+    """Crons commit between chunks, except when running tests."""
+    return not getattr(threading.current_thread(), 'testing', False)
 
 
 class LearningAgreement(models.Model):
@@ -11,6 +101,7 @@ class LearningAgreement(models.Model):
     _inherit = ['mail.thread', 'mail.activity.mixin']
 
     name = fields.Char(string='Agreement Reference', default=lambda self: _('New'), copy=False, tracking=True)
+    active = fields.Boolean(default=True)
 
     # Parties
     student_partner_id = fields.Many2one('res.partner', string='Student', required=True, tracking=True)
@@ -31,6 +122,8 @@ class LearningAgreement(models.Model):
     mobility_start_date = fields.Date(string='Mobility Start Date', tracking=True)
     mobility_end_date = fields.Date(string='Mobility End Date', tracking=True)
     learning_outcomes = fields.Text(string='Learning Outcomes', tracking=True)
+    mobility_period = fields.Char(string='Academic Year', compute='_compute_mobility_period', store=True, index=True,
+                                  help='Academic year (September to August) in which the mobility starts')
 
     host_org_name = fields.Char(string='Host Organization', tracking=True)
     host_org_street = fields.Char(string='Host Org Street', tracking=True)
@@ -55,19 +148,44 @@ class LearningAgreement(models.Model):
 
     # Portal security
     access_token = fields.Char('Access Token', copy=False, index=True)
+    access_token_hash = fields.Char('Access Token Hash', compute='_compute_access_token_hash', store=True, index=True, copy=False)
 
     # Generated document and signature
     contract_attachment_id = fields.Many2one('ir.attachment', string='Contract PDF', copy=False)
-    sign_request_id = fields.Many2one('sign.request', string='Sign Request', copy=False)
-    signature_sent_date = fields.Datetime(string='Signature Sent On', copy=False)
+    sign_request_id = fields.Many2one('sign.request', string='Sign Request', copy=False, index='btree_not_null')
+    sign_template_id = fields.Many2one('sign.template', string='Sign Template', copy=False)
+    signature_sent_date = fields.Datetime(string='Signature Sent On', copy=False, index=True)
     signature_deadline = fields.Date(string='Signature Deadline', copy=False)
+    signature_pending_role = fields.Selection([
+        ('student', 'Student'),
+        ('coordinator', 'Coordinator'),
+        ('both', 'Student and Coordinator'),
+    ], string='Waiting For', compute='_compute_signature_pending_role', store=True, index=True)
+    reminder_next_date = fields.Date(string='Next Reminder', copy=False, index=True)
+    reminder_count = fields.Integer(string='Reminders Sent', copy=False, readonly=True)
+    pdf_render_state = fields.Selection([
+        ('queued', 'Queued'),
+        ('rendering', 'Rendering'),
+        ('done', 'Generated'),
+        ('failed', 'Failed'),
+    ], string='Contract Generation', copy=False, readonly=True, index=True)
+    contract_hash = fields.Char(string='Contract Content Hash', copy=False, readonly=True,
+                                help='Hash of the printed values and report version of the current contract PDF')
 
     signature_status = fields.Selection([
         ('not_sent', 'Not Sent'),
         ('waiting', 'Waiting for Signatures'),
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
-    ], string='Signature Status', compute='_compute_signature_status')
+    ], string='Signature Status', compute='_compute_signature_status', store=True, index=True)
+
+    audit_ids = fields.One2many('learning.agreement.audit', 'agreement_id', string='Audit Log')
+    job_ids = fields.One2many('learning.agreement.job', 'agreement_id', string='Mail Jobs')
+    job_status = fields.Selection([
+        ('pending', 'Sending'),
+        ('failed', 'Sending Failed'),
+        ('done', 'Sent'),
+    ], string='Mail Status', compute='_compute_job_status')
 
     # Computed helpers
     access_url = fields.Char('Portal URL', compute='_compute_access_url', readonly=True)
@@ -76,6 +194,24 @@ class LearningAgreement(models.Model):
         ('access_token_unique', 'unique(access_token)', 'Access Token must be unique.'),
     ]
 
+    def _auto_init(self):
+        res = super()._auto_init()
+        # Portal listing: a student's agreements, filtered by state
+        create_index(self._cr, 'learning_agreement_student_state_index', self._table, ['student_partner_id', 'state'])
+        # Views, crons and the portal only ever look at active agreements
+        create_index(self._cr, 'learning_agreement_active_state_index', self._table, ['state'], where='active')
+        return res
+
+    @api.depends('mobility_start_date')
+    def _compute_mobility_period(self):
+        for record in self:
+            start = record.mobility_start_date
+            if not start:
+                record.mobility_period = False
+            else:
+                year = start.year if start.month >= 9 else start.year - 1
+                record.mobility_period = f"{year}-{year + 1}"
+
     @api.depends('sign_request_id.state')
     def _compute_signature_status(self):
         for record in self:
@@ -83,13 +219,60 @@ class LearningAgreement(models.Model):
                 record.signature_status = 'not_sent'
             else:
                 state = record.sign_request_id.state
-                if state in ('cancel', 'canceled'):
+                if state in SIGN_CANCEL_STATES:
                     record.signature_status = 'cancelled'
-                elif state in ('signed', 'completed', 'done'):
+                elif state in SIGN_DONE_STATES:
                     record.signature_status = 'completed'
                 else:
                     record.signature_status = 'waiting'
 
+    @api.depends('sign_request_id.request_item_ids.state', 'sign_request_id.request_item_ids.partner_id', 'student_partner_id')
+    def _compute_signature_pending_role(self):
+        for record in self:
+            pending = record.sign_request_id.request_item_ids.filtered(lambda item: item.state == 'sent')
+            student_pending = record.student_partner_id in pending.partner_id
+            other_pending = bool(pending.filtered(lambda item: item.partner_id != record.student_partner_id))
+            if student_pending and other_pending:
+                record.signature_pending_role = 'both'
+            elif student_pending:
+                record.signature_pending_role = 'student'
+            elif other_pending:
+                record.signature_pending_role = 'coordinator'
+            else:
+                record.signature_pending_role = False
+
+    @api.depends('job_ids.state')
+    def _compute_job_status(self):
+        for record in self:
+            states = set(record.job_ids.mapped('state'))
+            if states & {'pending', 'running'}:
+                record.job_status = 'pending'
+            elif record.job_ids and record.job_ids[0].state == 'failed':
+                record.job_status = 'failed'
+            elif states:
+                record.job_status = 'done'
+            else:
+                record.job_status = False
+
+    @api.depends('access_token')
+    def _compute_access_token_hash(self):
+        for record in self:
+            record.access_token_hash = hash_access_token(record.access_token) if record.access_token else False
+
+    @api.model
+    def _get_id_from_access_token(self, agreement_id, access_token):
+        """Return ``agreement_id`` if ``access_token`` grants access to that
+        agreement, archived or not, else False. One indexed query, no record
+        loaded."""
+        token_hash = hash_access_token(access_token)
+        self.flush_model(['access_token_hash'])
+        self.env.cr.execute(
+            f"SELECT access_token_hash FROM {self._table} WHERE id = %s AND access_token_hash = %s",
+            [agreement_id, token_hash],
+        )
+        row = self.env.cr.fetchone()
+        return agreement_id if row and consteq(row[0], token_hash) else False
+
     @api.depends('access_token', 'id')
     def _compute_access_url(self):
         base = self.env['ir.config_parameter'].sudo().get_param('web.base.url') or ''
@@ -100,58 +283,144 @@ class LearningAgreement(models.Model):
                 record.access_url = False
 
     @api.model
-    def create(self, vals):
-        if not vals.get('access_token'):
-            vals['access_token'] = secrets.token_urlsafe(24)
-        if vals.get('name', _('New')) == _('New'):
-            vals['name'] = self.env['ir.sequence'].next_by_code('learning.agreement') or _('New')
-        record = super().create(vals)
-        record._ensure_coordinator_partner()
-        record.message_subscribe(partner_ids=[pid for pid in [record.student_partner_id.id, record.coordinator_partner_id.id] if pid])
-        return record
+    def _reserve_names(self, count):
+        """Return ``count`` agreement references, drawn from the sequence in one query."""
+        sequence = self.env['ir.sequence'].sudo().search([
+            ('code', '=', 'learning.agreement'),
+            ('company_id', 'in', [self.env.company.id, False]),
+        ], order='company_id', limit=1)
+        if not sequence:
+            return [_('New')] * count
+        if sequence.implementation == 'standard' and not sequence.use_date_range:
+            self.env.cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                [f"ir_sequence_{sequence.id:03d}", count],
+            )
+            return [sequence.get_next_char(row[0]) for row in self.env.cr.fetchall()]
+        return [sequence._next() for _i in range(count)]
+
+    @api.model
+    def _get_default_coordinator_id(self):
+        # Pull from settings if available
+        coordinator_pid = self.env['ir.config_parameter'].sudo().get_param('sm_learning_agreement.coordinator_partner_id')
+        return int(coordinator_pid) if coordinator_pid else self.env.user.partner_id.id
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        if self._get_tracking_mode() == 'audit':
+            self = self.with_context(tracking_disable=True)
+        to_name = [vals for vals in vals_list if vals.get('name', _('New')) == _('New')]
+        for vals, name in zip(to_name, self._reserve_names(len(to_name)) if to_name else []):
+            vals['name'] = name
+        coordinator_id = None
+        for vals in vals_list:
+            if not vals.get('access_token'):
+                vals['access_token'] = secrets.token_urlsafe(24)
+            if not vals.get('coordinator_partner_id'):
+                if coordinator_id is None:
+                    coordinator_id = self._get_default_coordinator_id()
+                vals['coordinator_partner_id'] = coordinator_id
+        records = super().create(vals_list)
+        records._subscribe_parties()
+        return records
+
+    def _subscribe_parties(self):
+        """Subscribe student and coordinator with one insert for the whole batch.
+
+        As in ``mail.followers._insert_followers``, external partners (the
+        students) only get the default subtypes that are not internal.
+        """
+        Followers = self.env['mail.followers'].sudo()
+        existing = {
+            (follower.res_id, follower.partner_id.id)
+            for follower in Followers.search([('res_model', '=', self._name), ('res_id', 'in', self.ids)])
+        }
+        subtypes, _internal, external = self.env['mail.message.subtype'].default_subtypes(self._name)
+        vals_list = []
+        for rec in self:
+            for partner in rec.student_partner_id | rec.coordinator_partner_id:
+                if (rec.id, partner.id) not in existing:
+                    existing.add((rec.id, partner.id))
+                    vals_list.append({
+                        'res_model': self._name,
+                        'res_id': rec.id,
+                        'partner_id': partner.id,
+                        'subtype_ids': [(6, 0, (external if partner.partner_share else subtypes).ids)],
+                    })
+        return Followers.create(vals_list)
 
     def write(self, vals):
         self._check_portal_write_permissions(vals)
-        result = super().write(vals)
+        # Mail tracking is replaced by one audit entry per record and write
+        # in audit mode, and whenever tracking is disabled (crons, imports)
+        if self._get_tracking_mode() != 'audit' and not self.env.context.get('tracking_disable'):
+            return super().write(vals)
+        tracked = [fname for fname in vals if fname in self._fields and self._fields[fname].tracking]
+        old_values = {rec.id: {fname: rec._get_audit_value(fname) for fname in tracked} for rec in self}
+        result = super(LearningAgreement, self.with_context(tracking_disable=True)).write(vals)
+        audit_vals = []
+        for rec in self:
+            changes = {}
+            for fname in tracked:
+                new_value = rec._get_audit_value(fname)
+                if new_value != old_values[rec.id][fname]:
+                    changes[fname] = [old_values[rec.id][fname], new_value]
+            if changes:
+                audit_vals.append({'agreement_id': rec.id, 'user_id': self.env.uid, 'changes': changes})
+        if audit_vals:
+            self.env['learning.agreement.audit'].sudo().create(audit_vals)
         return result
 
+    @api.model
+    def _get_tracking_mode(self):
+        return self.env['ir.config_parameter'].sudo().get_param(TRACKING_MODE_PARAM) or 'full'
+
+    def _get_audit_value(self, fname):
+        """Return a compact, JSON serializable value of ``fname``."""
+        self.ensure_one()
+        value = self[fname]
+        if isinstance(value, models.BaseModel):
+            return [value.id, value.display_name] if value else False
+        if isinstance(value, datetime):
+            return fields.Datetime.to_string(value)
+        if isinstance(value, date):
+            return fields.Date.to_string(value)
+        return value
+
     # Permissions: allow portal users (students) to edit only green fields on their agreement
+    @api.model
+    @tools.ormcache('self.env.uid')
+    def _get_writer_role(self):
+        """Return the write role of the current user; cached per user and
+        cleared by the registry when groups change."""
+        user = self.env.user
+        if user.has_group('sm_learning_agreement.group_learning_agreement_manager'):
+            return 'manager'
+        if user.has_group('base.group_portal'):
+            return 'portal'
+        if user._is_admin():
+            return 'admin'
+        return 'none'
+
     def _check_portal_write_permissions(self, incoming_vals):
-        if self.env.user.has_group('sm_learning_agreement.group_learning_agreement_manager'):
+        # Superuser covers sudo() calls and crons running as the root user
+        if self.env.is_superuser():
+            return
+        role = self._get_writer_role()
+        if role in ('manager', 'admin'):
             return
-        if self.env.user.has_group('base.group_portal'):
-            allowed_fields = {
-                'student_full_name',
-                'student_email',
-                'student_phone',
-                'student_street',
-                'student_street2',
-                'student_zip',
-                'student_city',
-                'student_country_id',
-            }
-            extra = set(incoming_vals.keys()) - allowed_fields
-            if extra:
+        if role == 'portal':
+            if not PORTAL_WRITABLE_FIELDS.issuperset(incoming_vals):
                 raise AccessError(_('You are only allowed to edit your own contact fields.'))
-            # Ensure user is owner of the record
-            for rec in self:
-                if rec.student_partner_id != self.env.user.partner_id:
-                    raise AccessError(_('You can only modify your own agreement.'))
+            # Ensure user is owner of the records
+            if self.sudo().with_context(active_test=False).search_count([
+                ('id', 'in', self.ids),
+                ('student_partner_id', '!=', self.env.user.partner_id.id),
+            ], limit=1):
+                raise AccessError(_('You can only modify your own agreement.'))
         else:
             # Other users cannot write
-            if not self.env.user._is_admin():
-                raise AccessError(_('You do not have permission to modify this agreement.'))
-
-    def _ensure_coordinator_partner(self):
-        for rec in self:
-            if rec.coordinator_partner_id:
-                continue
-            # Pull from settings if available
-            coordinator_pid = self.env['ir.config_parameter'].sudo().get_param('sm_learning_agreement.coordinator_partner_id')
-            if coordinator_pid:
-                rec.coordinator_partner_id = int(coordinator_pid)
-            else:
-                rec.coordinator_partner_id = self.env.user.partner_id.id
+            raise AccessError(_('You do not have permission to modify this agreement.'))
 
     # Actions
     def action_send_student_form_email(self):
@@ -161,148 +430,503 @@ class LearningAgreement(models.Model):
                 raise UserError(_('Student partner must have an email address.'))
             if not rec.access_token:
                 rec.access_token = secrets.token_urlsafe(24)
-            if template:
-                template.send_mail(rec.id, force_send=True)
-            else:
+            if not template:
                 rec.message_post(body=_('Invite email template not found. Please configure mail template.'), message_type='notification')
+        if template:
+            self.env['learning.agreement.job']._enqueue(self, 'student_form_email')
+        return True
+
+    # Queued jobs, run by learning.agreement.job
+
+    def _job_student_form_email(self):
+        template = self.env.ref('sm_learning_agreement.mail_student_form_invite')
+        template.send_mail(self.id, force_send=True, raise_exception=True)
+
+    def _job_portal_invite(self):
+        self._invite_students_to_portal()
+        self.message_post(body=_('Portal invitation sent to %s') % self.student_partner_id.email, message_type='notification')
+
+    def _job_signature_request(self):
+        # The access mails sign.request.create would have sent, see no_sign_mail
+        self._get_pending_signer_items()._send_signature_access_mail()
+
+    def _job_signature_reminder(self):
+        reminded = self._send_pending_signer_reminders()
+        self.message_post(
+            body=_('Signature reminder sent to %s.', ', '.join(reminded.partner_id.mapped('name'))),
+            message_type='notification',
+        )
 
     def _render_contract_pdf(self):
         self.ensure_one()
-        report = self.env.ref('sm_learning_agreement.action_report_learning_agreement')
+        return self._render_contract_pdfs()
+
+    @api.model
+    def _get_report_version(self):
+        """Hash what every contract of the batch prints besides its own
+        values: the report views and the company's external layout with
+        every view inheriting from them, and the company details shown in
+        its header and footer."""
+        digest = hashlib.sha256()
+        company = self.env.company.sudo()
+        views = [self.env.ref(xmlid, raise_if_not_found=False) or xmlid for xmlid in REPORT_VIEW_XMLIDS]
+        views.append(company.external_report_layout_id)
+        for view in views:
+            # Combined with the views inheriting from it, as rendered
+            if isinstance(view, models.BaseModel):
+                digest.update(etree.tostring(view.sudo()._get_combined_arch()) if view else b'')
+            else:
+                digest.update(view.encode())
+        company_values = [company[fname] for fname in REPORT_COMPANY_FIELDS if fname in company._fields]
+        digest.update(json.dumps(company_values, default=str).encode())
+        return digest.hexdigest()
+
+    def _get_contract_hash(self, report_version):
+        self.ensure_one()
+        values = [report_version]
+        for path in REPORT_HASH_FIELDS:
+            value = self
+            for fname in path.split('.'):
+                value = value[fname]
+            values.append(value)
+        return hashlib.sha256(json.dumps(values, default=str).encode()).hexdigest()
+
+    @instrumented('render_contract_pdfs')
+    def _render_contract_pdfs(self):
+        """Render the contracts of ``self`` in one QWeb/wkhtmltopdf pass.
+
+        Agreements whose printed values and report version did not change
+        since their last render keep their PDF. The others are rendered
+        together, the resulting PDF is split per agreement and the
+        attachments are created with a single ``ir.attachment.create``.
+        """
+        if not self:
+            return self.env['ir.attachment']
+        report = self.env.ref(REPORT_XMLID, raise_if_not_found=False)
         if not report:
             raise UserError(_('Learning Agreement report is not defined.'))
-        pdf_content, content_type = report._render_qweb_pdf([self.id])
-        # Create or replace attachment
-        attachment_vals = {
-            'name': f"{self.name}_Learning_Agreement.pdf",
+        report_version = self._get_report_version()
+        hashes = {rec.id: rec._get_contract_hash(report_version) for rec in self}
+        cached = self.filtered(lambda r: r.contract_attachment_id and r.contract_hash == hashes[r.id])
+        to_render = self - cached
+        current_span().cache_hits = len(cached)
+        if cached:
+            cached.filtered(lambda r: r.pdf_render_state != 'done').write({'pdf_render_state': 'done'})
+        if not to_render:
+            return self.contract_attachment_id
+
+        streams = self.env['ir.actions.report']._render_qweb_pdf_prepare_streams(REPORT_XMLID, {}, res_ids=to_render.ids)
+        pdf_contents = {}
+        if set(to_render.ids) <= set(streams):
+            for res_id in to_render.ids:
+                pdf_contents[res_id] = streams[res_id]['stream'].getvalue()
+        else:
+            # The PDF could not be split on its outlines, render one by one
+            for rec in to_render:
+                pdf_contents[rec.id] = self.env['ir.actions.report']._render_qweb_pdf(REPORT_XMLID, [rec.id])[0]
+        for stream in streams.values():
+            if stream.get('stream'):
+                stream['stream'].close()
+
+        superseded = to_render.contract_attachment_id
+        attachments = self.env['ir.attachment'].create([{
+            'name': f"{rec.name}_Learning_Agreement.pdf",
             'type': 'binary',
-            'datas': base64.b64encode(pdf_content).decode(),
+            'datas': base64.b64encode(pdf_contents[rec.id]).decode(),
             'res_model': self._name,
-            'res_id': self.id,
+            'res_id': rec.id,
             'mimetype': 'application/pdf',
-        }
-        if self.contract_attachment_id:
-            self.contract_attachment_id.write(attachment_vals)
-        else:
-            self.contract_attachment_id = self.env['ir.attachment'].create(attachment_vals)
+        } for rec in to_render])
+        for rec, attachment in zip(to_render, attachments):
+            rec.write({
+                'contract_attachment_id': attachment.id,
+                'contract_hash': hashes[rec.id],
+                'pdf_render_state': 'done',
+            })
+        self._unlink_unused_contract_attachments(superseded)
         return self.contract_attachment_id
 
+    @api.model
+    def _unlink_unused_contract_attachments(self, attachments):
+        """Remove replaced contract PDFs, except those still used as the
+        document of a sign template or attached to a chatter message."""
+        attachments = attachments.sudo()
+        in_use = self.env['sign.template'].sudo().with_context(active_test=False).search([
+            ('attachment_id', 'in', attachments.ids),
+        ]).attachment_id
+        in_use |= self.env['mail.message'].sudo().search([
+            ('attachment_ids', 'in', attachments.ids),
+        ]).attachment_ids
+        (attachments - in_use).unlink()
+
     def action_generate_pdf(self):
-        for rec in self:
-            rec._render_contract_pdf()
+        if len(self) <= 1:
+            self._render_contract_pdfs()
+            return True
+        # Large selections are rendered in the background by the render cron
+        self.write({'pdf_render_state': 'queued'})
+        self.env.ref('sm_learning_agreement.ir_cron_learning_agreement_render_pdf')._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'message': _('%s contracts are being generated in the background.', len(self)),
+                'type': 'info',
+                'sticky': False,
+            },
+        }
+
+    @api.model
+    @instrumented('cron_render_queued_pdfs')
+    def cron_render_queued_pdfs(self):
+        """Render queued contracts in chunks of ``RENDER_CHUNK_SIZE`` records."""
+        # Chunks left rendering by a killed worker are queued again
+        self.search([
+            ('pdf_render_state', '=', 'rendering'),
+            ('write_date', '<', fields.Datetime.now() - RENDER_STALE_DELAY),
+        ]).write({'pdf_render_state': 'queued'})
+        queued = self.search([('pdf_render_state', '=', 'queued')], limit=RENDER_BATCH_LIMIT, order='id')
+        span = current_span()
+        span.records = len(queued)
+        for start in range(0, len(queued), RENDER_CHUNK_SIZE):
+            chunk = queued[start:start + RENDER_CHUNK_SIZE]
+            chunk.write({'pdf_render_state': 'rendering'})
+            if _auto_commit_enabled():
+                self.env.cr.commit()
+            try:
+                with self.env.cr.savepoint():
+                    chunk._render_contract_pdfs()
+            except Exception:
+                _logger.exception('Contract rendering failed for agreements %s', chunk.ids)
+                chunk.write({'pdf_render_state': 'failed'})
+                span.failures += len(chunk)
+            if _auto_commit_enabled():
+                self.env.cr.commit()
+        if len(queued) == RENDER_BATCH_LIMIT:
+            self.env.ref('sm_learning_agreement.ir_cron_learning_agreement_render_pdf')._trigger()
         return True
 
+    @api.model
+    def _get_sign_layout(self):
+        """Resolve the sign roles and item type used by the contract layout.
+
+        Meant to be called once per batch; missing roles are created.
+        """
+        SignItemRole = self.env['sign.item.role']
+        role_names = [name for name, _sequence, _label, _pos_x in SIGN_LAYOUT]
+        roles = {role.name: role for role in SignItemRole.search([('name', 'in', role_names)])}
+        for name, sequence, _label, _pos_x in SIGN_LAYOUT:
+            if name not in roles:
+                roles[name] = SignItemRole.create({'name': name, 'sequence': sequence})
+        return {
+            'roles': roles,
+            'type_id': self.env.ref('sign.sign_item_type_signature').id,
+        }
+
+    def _prepare_sign_template_vals(self, layout):
+        self.ensure_one()
+        return {
+            'name': f"Learning Agreement {self.name}",
+            'attachment_id': self.contract_attachment_id.id,
+            'responsible_id': self.env.user.id,
+            # Per-agreement templates are kept out of the Sign app's lists
+            'active': False,
+            'sign_item_ids': [
+                (0, 0, {
+                    'name': label,
+                    'type_id': layout['type_id'],
+                    'role_id': layout['roles'][role_name].id,
+                    'page': 1,
+                    'posX': pos_x,
+                    'posY': 0.10,
+                    'width': 0.30,
+                    'height': 0.07,
+                })
+                for role_name, _sequence, label, pos_x in SIGN_LAYOUT
+            ],
+        }
+
+    def _prepare_sign_request_vals(self, template, layout):
+        self.ensure_one()
+        roles = layout['roles']
+        return {
+            'reference': f"LA-{self.name}",
+            'template_id': template.id,
+            'request_item_ids': [
+                (0, 0, {
+                    'partner_id': self.student_partner_id.id,
+                    'role_id': roles['Student'].id,
+                    'mail_sent_order': 1,
+                }),
+                (0, 0, {
+                    'partner_id': self.coordinator_partner_id.id,
+                    'role_id': roles['Coordinator'].id,
+                    'mail_sent_order': 2,
+                }),
+            ]
+        }
+
+    @instrumented('send_for_signature')
     def action_send_for_signature(self):
         SignTemplate = self.env['sign.template']
-        SignItemRole = self.env['sign.item.role']
         SignRequest = self.env['sign.request']
 
+        # Ensure required parties
         for rec in self:
-            # Ensure required parties
             if not rec.student_partner_id or not rec.coordinator_partner_id:
                 raise UserError(_('Both student and coordinator must be set.'))
-            # Render document
-            attachment = rec._render_contract_pdf()
-
-            # Create or reuse roles
-            student_role = SignItemRole.search([('name', '=', 'Student')], limit=1)
-            if not student_role:
-                student_role = SignItemRole.create({'name': 'Student', 'sequence': 10})
-            coordinator_role = SignItemRole.search([('name', '=', 'Coordinator')], limit=1)
-            if not coordinator_role:
-                coordinator_role = SignItemRole.create({'name': 'Coordinator', 'sequence': 20})
-
-            # Create a one-off template from the generated PDF with two signature boxes
-            template = SignTemplate.create({
-                'name': f"Learning Agreement {rec.name}",
-                'attachment_id': attachment.id,
-                'responsible_id': self.env.user.id,
-                'sign_item_ids': [
-                    (0, 0, {
-                        'name': 'Student Signature',
-                        'type_id': self.env.ref('sign.sign_item_type_signature').id,
-                        'role_id': student_role.id,
-                        'page': 1,
-                        'posX': 0.10,
-                        'posY': 0.10,
-                        'width': 0.30,
-                        'height': 0.07,
-                    }),
-                    (0, 0, {
-                        'name': 'Coordinator Signature',
-                        'type_id': self.env.ref('sign.sign_item_type_signature').id,
-                        'role_id': coordinator_role.id,
-                        'page': 1,
-                        'posX': 0.60,
-                        'posY': 0.10,
-                        'width': 0.30,
-                        'height': 0.07,
-                    }),
-                ]
-            })
+        if not self:
+            return True
+        layout = self._get_sign_layout()
 
-            # Create sign request with the two roles mapped to partners
-            request = SignRequest.create({
-                'reference': f"LA-{rec.name}",
-                'template_id': template.id,
-                'request_item_ids': [
-                    (0, 0, {
-                        'partner_id': rec.student_partner_id.id,
-                        'role_id': student_role.id,
-                        'mail_sent_order': 1,
-                    }),
-                    (0, 0, {
-                        'partner_id': rec.coordinator_partner_id.id,
-                        'role_id': coordinator_role.id,
-                        'mail_sent_order': 2,
-                    }),
-                ]
-            })
+        # Render documents
+        self._render_contract_pdfs()
+
+        # The signed document is the template's attachment, and a request is
+        # made from every template right away: each send gets a new template
+        templates = SignTemplate.create([rec._prepare_sign_template_vals(layout) for rec in self])
 
-            # Send emails to signers
-            request.action_send_mail()
+        # Create all sign requests with the two roles mapped to partners; their
+        # access mails are sent by the signature_request job, not inline
+        requests = SignRequest.with_context(no_sign_mail=True).create(
+            [rec._prepare_sign_request_vals(template, layout) for rec, template in zip(self, templates)])
 
+        now = fields.Datetime.now()
+        for rec, template, request in zip(self, templates, requests):
             rec.write({
                 'sign_request_id': request.id,
+                'sign_template_id': template.id,
                 'state': 'sent',
-                'signature_sent_date': fields.Datetime.now(),
+                'signature_sent_date': now,
+                'reminder_count': 0,
             })
+        self._schedule_next_reminder()
+        # Send emails to signers from the job queue
+        self.env['learning.agreement.job']._enqueue(self, 'signature_request')
         return True
 
+    @api.model
+    def _get_reminder_schedule(self):
+        """Return the reminder delays in days: the first one counts from the
+        signature request, the next ones from the previous reminder. The last
+        delay repeats."""
+        raw = self.env['ir.config_parameter'].sudo().get_param(REMINDER_SCHEDULE_PARAM) or ''
+        try:
+            delays = [int(part) for part in raw.split(',') if part.strip()]
+        except ValueError:
+            delays = []
+        return [delay for delay in delays if delay > 0] or list(DEFAULT_REMINDER_SCHEDULE)
+
+    def _schedule_next_reminder(self):
+        """Set the next reminder date from the current reminder count."""
+        schedule = self._get_reminder_schedule()
+        today = fields.Date.context_today(self)
+        by_delay = {}
+        for rec in self:
+            delay = schedule[min(rec.reminder_count, len(schedule) - 1)]
+            by_delay[delay] = by_delay.get(delay, self.browse()) | rec
+        for delay, records in by_delay.items():
+            records.write({'reminder_next_date': today + timedelta(days=delay)})
+
+    def _get_pending_signer_items(self):
+        """Return the sign request items waiting for a signature now: with
+        a signing order, only the lowest pending ``mail_sent_order`` of each
+        request, as the next signers were not invited yet."""
+        items = self.env['sign.request.item']
+        for sign_request in self.sign_request_id:
+            pending = sign_request.request_item_ids.filtered(lambda item: item.state == 'sent')
+            if pending:
+                order = min(pending.mapped('mail_sent_order'))
+                items |= pending.filtered(lambda item: item.mail_sent_order == order)
+        return items
+
+    def _send_pending_signer_reminders(self):
+        """Send a reminder to the signers whose turn it is to sign."""
+        pending_items = self._get_pending_signer_items()
+        pending_items._send_signature_access_mail()
+        by_count = {}
+        for rec in self:
+            by_count[rec.reminder_count] = by_count.get(rec.reminder_count, self.browse()) | rec
+        for count, records in by_count.items():
+            records.write({'reminder_count': count + 1})
+        self._schedule_next_reminder()
+        return pending_items
+
     def action_send_signature_reminder(self):
         for rec in self:
             if not rec.sign_request_id:
                 raise UserError(_('No signature request to remind.'))
-            rec.sign_request_id.action_send_mail()
-            rec.message_post(body=_('Signature reminder sent.'), message_type='notification')
+        self.env['learning.agreement.job']._enqueue(self, 'signature_reminder')
         return True
 
     @api.model
+    @instrumented('cron_send_overdue_signature_reminders')
     def cron_send_overdue_signature_reminders(self):
-        # Find agreements sent more than 7 days ago and not signed yet
-        seven_days_ago = fields.Datetime.now() - timedelta(days=7)
-        overdue = self.search([
+        """Queue a reminder job for the agreements that are due.
+
+        At most ``reminder_batch_limit`` agreements are queued per run; the
+        mails are sent by the job runner, which also schedules the next
+        reminder, so agreements already waiting for one are skipped.
+        """
+        icp = self.env['ir.config_parameter'].sudo()
+        limit = int(icp.get_param(REMINDER_BATCH_LIMIT_PARAM, DEFAULT_REMINDER_BATCH_LIMIT))
+        due = self.search([
             ('state', '=', 'sent'),
-            ('signature_sent_date', '<=', seven_days_ago),
-        ])
-        for rec in overdue:
-            try:
-                rec.action_send_signature_reminder()
-            except Exception as e:
-                rec.message_post(body=_('Failed to send reminder: %s') % e)
+            ('reminder_next_date', '<=', fields.Date.context_today(self)),
+            ('job_ids', 'not any', [('job_type', '=', 'signature_reminder'), ('state', 'in', ('pending', 'running'))]),
+        ], limit=limit, order='reminder_next_date, id')
+        jobs = self.env['learning.agreement.job']._enqueue(due, 'signature_reminder')
+        _logger.info('Signature reminders: %s agreements due, %s queued', len(due), len(jobs))
+        current_span().records = len(due)
+        return True
+
+    def _get_signature_target_states(self):
+        """Return {target_state: agreements} for agreements whose sign request
+        reached a final state that is not reflected on the agreement yet."""
+        targets = {}
+        for rec in self:
+            sign_state = rec.sign_request_id.state
+            if sign_state in SIGN_DONE_STATES and rec.state != 'signed':
+                target = 'signed'
+            elif sign_state in SIGN_CANCEL_STATES and rec.state != 'cancelled':
+                target = 'cancelled'
+            else:
+                continue
+            targets[target] = targets.get(target, self.browse()) | rec
+        return targets
+
+    def _sync_signature_state(self):
+        """Apply the final state of the linked sign requests, one write per target state."""
+        for target, records in self._get_signature_target_states().items():
+            records.write({'state': target})
         return True
 
     @api.model
+    @instrumented('cron_sync_signature_state')
     def cron_sync_signature_state(self):
-        agreements = self.search([('sign_request_id', '!=', False)])
-        for rec in agreements:
-            if not rec.sign_request_id:
-                continue
-            state = rec.sign_request_id.state
-            if state in ('signed', 'completed', 'done') and rec.state != 'signed':
-                rec.state = 'signed'
-            elif state in ('cancel', 'canceled') and rec.state != 'cancelled':
-                rec.state = 'cancelled'
+        """Reconcile agreement states with their sign requests.
+
+        State changes are pushed by ``sign.request.write``; this cron is only a
+        safety net. Only agreements whose sign request was written since the
+        previous run (minus ``SYNC_LOOKBACK``) are scanned, in id-ordered
+        chunks each committed on its own. Agreements of a failing chunk are
+        kept aside and retried first on the next run, so they never hold the
+        watermark back.
+        """
+        icp = self.env['ir.config_parameter'].sudo()
+        watermark = icp.get_param(SYNC_WATERMARK_PARAM)
+        previously_failed = [int(rec_id) for rec_id in (icp.get_param(SYNC_FAILED_IDS_PARAM) or '').split(',') if rec_id]
+        run_start = fields.Datetime.now()
+
+        domain = [('sign_request_id', '!=', False)]
+        if watermark:
+            domain.append(('sign_request_id.write_date', '>', fields.Datetime.from_string(watermark) - SYNC_LOOKBACK))
+        # State changes are recorded in the audit log rather than the chatter
+        Agreement = self.with_context(tracking_disable=True)
+
+        scanned = transitioned = 0
+        failed_ids = []
+
+        def sync_chunk(chunk):
+            nonlocal scanned, transitioned
+            scanned += len(chunk)
+            try:
+                chunk_transitioned = 0
+                with self.env.cr.savepoint():
+                    for target, records in chunk._get_signature_target_states().items():
+                        records.write({'state': target})
+                        chunk_transitioned += len(records)
+                # Only counted once the savepoint is released
+                transitioned += chunk_transitioned
+            except Exception:
+                failed_ids.extend(chunk.ids)
+                _logger.exception('Signature state sync failed for agreements %s', chunk.ids)
+            if _auto_commit_enabled():
+                self.env.cr.commit()
+
+        for start in range(0, len(previously_failed), SYNC_CHUNK_SIZE):
+            sync_chunk(Agreement.browse(previously_failed[start:start + SYNC_CHUNK_SIZE]).exists())
+        last_id = 0
+        while True:
+            chunk = Agreement.search(domain + [('id', '>', last_id)], order='id', limit=SYNC_CHUNK_SIZE)
+            if not chunk:
+                break
+            sync_chunk(chunk)
+            last_id = chunk[-1].id
+
+        icp.set_param(SYNC_WATERMARK_PARAM, fields.Datetime.to_string(run_start))
+        if failed_ids or previously_failed:
+            icp.set_param(SYNC_FAILED_IDS_PARAM, ','.join(map(str, sorted(set(failed_ids)))) or False)
+        _logger.info(
+            'Signature state sync: %s agreements scanned, %s transitioned, %s failed',
+            scanned, transitioned, len(failed_ids),
+        )
+        span = current_span()
+        span.records, span.failures = scanned, len(failed_ids)
+        return {'scanned': scanned, 'transitioned': transitioned, 'failed': len(failed_ids)}
+
+    def _unlink_superseded_contracts(self):
+        """Remove the contract PDFs generated by an earlier render and
+        replaced since. Only attachments named like a generated contract are
+        considered, so PDFs uploaded by users on the agreement are kept."""
+        contract_names = {rec.id: f"{rec.name}_Learning_Agreement.pdf" for rec in self}
+        attachments = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('name', 'in', list(set(contract_names.values()))),
+            ('id', 'not in', self.contract_attachment_id.ids),
+        ]).filtered(lambda a: a.name == contract_names[a.res_id])
+        self._unlink_unused_contract_attachments(attachments)
+
+    def _unlink_orphan_sign_templates(self):
+        """Remove the per-agreement sign templates no request was made from."""
+        templates = self.with_context(active_test=False).sign_template_id.sudo()
+        templates.filtered(lambda template: not template.sign_request_ids).unlink()
+
+    def _thin_tracking_messages(self):
+        """Remove tracking-only messages, keeping comments and notes."""
+        messages = self.env['mail.message'].sudo().search([
+            ('model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('message_type', '=', 'notification'),
+            ('tracking_value_ids', '!=', False),
+        ])
+        messages.filtered(lambda message: is_html_empty(message.body)).unlink()
+
+    def _archive_agreements(self):
+        self.with_context(tracking_disable=True).write({'active': False})
+        self._unlink_superseded_contracts()
+        self._unlink_orphan_sign_templates()
+        self._thin_tracking_messages()
+
+    @api.model
+    @instrumented('cron_archive_agreements')
+    def cron_archive_agreements(self):
+        """Archive signed and cancelled agreements whose mobility ended more
+        than the retention period ago, in committed chunks."""
+        icp = self.env['ir.config_parameter'].sudo()
+        retention = int(icp.get_param(ARCHIVE_RETENTION_PARAM, DEFAULT_ARCHIVE_RETENTION_DAYS))
+        cutoff = fields.Date.context_today(self) - timedelta(days=retention)
+        to_archive = self.search([
+            ('state', 'in', ('signed', 'cancelled')),
+            ('mobility_end_date', '<', cutoff),
+        ], limit=ARCHIVE_BATCH_LIMIT, order='mobility_end_date, id')
+        archived = 0
+        for start in range(0, len(to_archive), ARCHIVE_CHUNK_SIZE):
+            chunk = to_archive[start:start + ARCHIVE_CHUNK_SIZE]
+            try:
+                with self.env.cr.savepoint():
+                    chunk._archive_agreements()
+                archived += len(chunk)
+            except Exception:
+                _logger.exception('Archiving failed for agreements %s', chunk.ids)
+            if _auto_commit_enabled():
+                self.env.cr.commit()
+        _logger.info('Agreement archiving: %s of %s agreements archived', archived, len(to_archive))
+        span = current_span()
+        span.records, span.failures = len(to_archive), len(to_archive) - archived
+        if len(to_archive) == ARCHIVE_BATCH_LIMIT:
+            self.env.ref('sm_learning_agreement.ir_cron_learning_agreement_archive')._trigger()
         return True
 
     def action_mark_ready(self):
@@ -318,27 +942,43 @@ class LearningAgreement(models.Model):
             rec.state = 'cancelled'
 
     # Portal helpers
+    def _invite_students_to_portal(self):
+        """Give the students of ``self`` portal access in batch.
+
+        Existing portal users are added to the portal group with one write,
+        missing users are created with one create and their welcome mails are
+        queued. Students already linked to an internal or archived user, or
+        whose email is the login of another user, are left untouched.
+        Return the created users.
+        """
+        portal_group = self.env.ref('base.group_portal')
+        Users = self.env['res.users'].with_context(active_test=False)
+        partners = self.student_partner_id.with_context(active_test=False)
+        by_login = Users.search([('login', 'in', [email for email in partners.mapped('email') if email])])
+        logins = set(by_login.mapped('login'))
+        # Ensure the existing external users are in portal group
+        main_users = (partners.user_ids | by_login).filtered(lambda u: u.active and u.share and not u._is_public())
+        if main_users:
+            main_users.write({'groups_id': [(4, portal_group.id, 0)]})
+        to_create = partners.filtered(lambda p: not p.user_ids and p.email not in logins)
+        names = {rec.student_partner_id.id: rec.student_full_name for rec in self}
+        users = self.env['res.users'].with_context(no_reset_password=True).create([{
+            'name': partner.name or names.get(partner.id) or 'Student',
+            'login': partner.email,
+            'email': partner.email,
+            'partner_id': partner.id,
+            'groups_id': [(6, 0, [portal_group.id])],
+        } for partner in to_create])
+        # Queue the signup invitations; import_file keeps auth_signup from
+        # sending each mail inline
+        if users:
+            users.with_context(create_user=True, import_file=True).action_reset_password()
+        return users
+
     def action_invite_student_to_portal(self):
         """Invite the student partner to portal access and send a signup email."""
-        portal_group = self.env.ref('base.group_portal')
-        template = self.env.ref('portal.mail_template_data_portal_welcome', raise_if_not_found=False)
         for rec in self:
-            partner = rec.student_partner_id
-            if not partner.email:
+            if not rec.student_partner_id.email:
                 raise UserError(_('Student partner must have an email address.'))
-            if partner.user_ids:
-                # Ensure the main user is in portal group
-                partner.user_ids[0].write({'groups_id': [(4, portal_group.id, 0)]})
-            else:
-                # Create user in portal
-                user = self.env['res.users'].with_context(no_reset_password=True).create({
-                    'name': partner.name or rec.student_full_name or 'Student',
-                    'login': partner.email,
-                    'email': partner.email,
-                    'partner_id': partner.id,
-                    'groups_id': [(6, 0, [portal_group.id])],
-                })
-                # Send welcome template with signup URL
-                if template:
-                    template.with_context(lang=user.lang).send_mail(partner.id, force_send=True)
-            rec.message_post(body=_('Portal invitation sent to %s') % partner.email, message_type='notification')
\ No newline at end of file
+        self.env['learning.agreement.job']._enqueue(self, 'portal_invite')
+        return True
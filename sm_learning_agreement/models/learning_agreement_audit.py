@@ -0,0 +1,24 @@
+from odoo import fields, models
+
+
+class LearningAgreementAudit(models.Model):
+    _name = 'learning.agreement.audit'
+    _description = 'Learning Agreement Audit Entry'
+    _order = 'id desc'
+
+    agreement_id = fields.Many2one('learning.agreement', string='Agreement', required=True, index=True, ondelete='cascade')
+    user_id = fields.Many2one('res.users', string='Changed By', readonly=True)
+    changes = fields.Json(string='Changes', readonly=True,
+                          help='Changed fields as {field name: [old value, new value]}')
+    changes_display = fields.Text(string='Summary', compute='_compute_changes_display')
+
+    def _compute_changes_display(self):
+        agreement_fields = self.env['learning.agreement']._fields
+        for entry in self:
+            lines = []
+            for fname, (old, new) in (entry.changes or {}).items():
+                label = agreement_fields[fname].string if fname in agreement_fields else fname
+                # Relational values are stored as [id, display name]
+                old, new = (value[1] if isinstance(value, list) else value for value in (old, new))
+                lines.append(f"{label}: {old or ''} → {new or ''}")
+            entry.changes_display = '\n'.join(lines)
@@ -0,0 +1,127 @@
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from datetime import timedelta
+from .learning_agreement import _auto_commit_enabled
+import logging
+
+_logger = logging.getLogger(__name__)
+
+JOB_CONCURRENCY_PARAM = 'sm_learning_agreement.job_concurrency'
+DEFAULT_JOB_CONCURRENCY = 50
+JOB_MAX_ATTEMPTS = 5
+# Retry delays grow as JOB_RETRY_DELAY * 2 ** (attempts - 1)
+JOB_RETRY_DELAY = timedelta(minutes=1)
+# Running jobs older than this are considered lost (worker killed) and retried
+JOB_STALE_DELAY = timedelta(hours=1)
+
+
+class LearningAgreementJob(models.Model):
+    _name = 'learning.agreement.job'
+    _description = 'Learning Agreement Mail Job'
+    _order = 'id desc'
+
+    agreement_id = fields.Many2one('learning.agreement', string='Agreement', required=True, index=True, ondelete='cascade')
+    job_type = fields.Selection([
+        ('student_form_email', 'Form Link Email'),
+        ('portal_invite', 'Portal Invitation'),
+        ('signature_request', 'Signature Request'),
+        ('signature_reminder', 'Signature Reminder'),
+    ], string='Job', required=True, readonly=True)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='pending', required=True, index=True, readonly=True)
+    attempts = fields.Integer(string='Attempts', readonly=True)
+    next_attempt_date = fields.Datetime(string='Next Attempt', default=fields.Datetime.now, index=True, readonly=True)
+    error = fields.Text(string='Last Error', readonly=True)
+    user_id = fields.Many2one('res.users', string='Queued By', readonly=True)
+
+    @api.model
+    def _enqueue(self, agreements, job_type):
+        """Create one pending job per agreement, unless one is already
+        waiting, and wake up the runner. Jobs run as the current user."""
+        waiting = self.search([
+            ('agreement_id', 'in', agreements.ids),
+            ('job_type', '=', job_type),
+            ('state', 'in', ('pending', 'running')),
+        ]).agreement_id
+        jobs = self.sudo().create([
+            {'agreement_id': agreement.id, 'job_type': job_type, 'user_id': self.env.uid}
+            for agreement in agreements - waiting
+        ])
+        if jobs:
+            self.env.ref('sm_learning_agreement.ir_cron_learning_agreement_job_runner')._trigger()
+        return jobs
+
+    def _execute(self):
+        self.ensure_one()
+        agreement = self.agreement_id
+        if self.user_id:
+            # Act as the user who queued the job, not the cron user
+            agreement = agreement.with_user(self.user_id)
+        method = getattr(agreement, f"_job_{self.job_type}", None)
+        if method is None:
+            raise UserError(_('Unknown job type %s.', self.job_type))
+        method()
+
+    def action_retry(self):
+        self.write({'state': 'pending', 'attempts': 0, 'next_attempt_date': fields.Datetime.now(), 'error': False})
+        self.env.ref('sm_learning_agreement.ir_cron_learning_agreement_job_runner')._trigger()
+        return True
+
+    @api.model
+    def _claim_jobs(self):
+        """Lock and mark as running the next due jobs, within the
+        concurrency cap shared by all runner workers."""
+        cap = int(self.env['ir.config_parameter'].sudo().get_param(JOB_CONCURRENCY_PARAM, DEFAULT_JOB_CONCURRENCY))
+        now = fields.Datetime.now()
+        self.search([
+            ('state', '=', 'running'),
+            ('write_date', '<', now - JOB_STALE_DELAY),
+        ]).write({'state': 'pending'})
+        available = cap - self.search_count([('state', '=', 'running')])
+        if available <= 0:
+            return self.browse()
+        self.flush_model()
+        self.env.cr.execute(f"""
+            SELECT id FROM {self._table}
+             WHERE state = 'pending' AND next_attempt_date <= %s
+          ORDER BY next_attempt_date, id
+             LIMIT %s
+               FOR UPDATE SKIP LOCKED
+        """, [now, available])
+        jobs = self.browse([row[0] for row in self.env.cr.fetchall()])
+        jobs.write({'state': 'running'})
+        return jobs
+
+    @api.model
+    def cron_run_jobs(self):
+        jobs = self._claim_jobs()
+        if _auto_commit_enabled():
+            self.env.cr.commit()
+        done = failed = 0
+        for job in jobs:
+            try:
+                with self.env.cr.savepoint():
+                    job._execute()
+                job.write({'state': 'done', 'attempts': job.attempts + 1, 'error': False})
+                done += 1
+            except Exception as e:
+                _logger.warning('Learning agreement job %s (%s) failed', job.id, job.job_type, exc_info=True)
+                attempts = job.attempts + 1
+                job.write({
+                    'state': 'failed' if attempts >= JOB_MAX_ATTEMPTS else 'pending',
+                    'attempts': attempts,
+                    'next_attempt_date': fields.Datetime.now() + JOB_RETRY_DELAY * 2 ** (attempts - 1),
+                    'error': str(e),
+                })
+                failed += 1
+            if _auto_commit_enabled():
+                self.env.cr.commit()
+        if jobs:
+            _logger.info('Learning agreement jobs: %s done, %s failed', done, failed)
+            # More work may be waiting behind the concurrency cap
+            self.env.ref('sm_learning_agreement.ir_cron_learning_agreement_job_runner')._trigger()
+        return True
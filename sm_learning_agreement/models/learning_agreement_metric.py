@@ -0,0 +1,238 @@
+from odoo import SUPERUSER_ID, api, fields, models, _
+from odoo.http import SessionExpiredException, request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from markupsafe import Markup, escape
+from werkzeug.exceptions import HTTPException
+import base64
+import cProfile
+import functools
+import logging
+import marshal
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+PROFILING_PARAM = 'sm_learning_agreement.profiling_enabled'
+PROFILING_THRESHOLD_PARAM = 'sm_learning_agreement.profiling_threshold_ms'
+METRIC_HISTORY_PARAM = 'sm_learning_agreement.metric_history'
+DEFAULT_PROFILING_THRESHOLD_MS = 5000
+DEFAULT_METRIC_HISTORY = 200
+
+_current_span = ContextVar('learning_agreement_metric_span', default=None)
+
+
+class MetricSpan:
+    """Counters of one instrumented run, filled in by the instrumented code."""
+    __slots__ = ('records', 'failures', 'cache_hits')
+
+    def __init__(self, records=0):
+        self.records = records
+        self.failures = 0
+        self.cache_hits = 0
+
+
+def current_span():
+    """Return the span of the innermost instrumented run, or a detached one."""
+    return _current_span.get() or MetricSpan()
+
+
+@contextmanager
+def metric_span(env, operation, records=0, persist=True):
+    """Measure duration, SQL queries, records and failures of a block.
+
+    Every run is logged. It is stored as a ``learning.agreement.metric`` run
+    when ``persist`` is set, and otherwise only when it failed or was slower
+    than the profiling threshold. Expected HTTP outcomes of portal routes
+    (access denied, not found, rate limited) are not failures; only server
+    errors are. Only the outermost span is profiled.
+    """
+    outer = _current_span.get() is None
+    # Read up front: the cursor may be aborted once the measured code failed
+    threshold_ms = int(env['ir.config_parameter'].sudo().get_param(
+        PROFILING_THRESHOLD_PARAM, DEFAULT_PROFILING_THRESHOLD_MS))
+    span = MetricSpan(records)
+    token = _current_span.set(span)
+    profiler = None
+    error = False
+    queries_before = env.cr.sql_log_count
+    start = time.perf_counter()
+    try:
+        if outer and env['ir.config_parameter'].sudo().get_param(PROFILING_PARAM):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler (e.g. Odoo's) is already running
+                profiler = None
+        yield span
+    except (HTTPException, SessionExpiredException) as e:
+        if isinstance(e, HTTPException) and (e.code or 500) >= 500:
+            error = repr(e)
+        raise
+    except Exception as e:
+        error = repr(e)
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+        duration_ms = (time.perf_counter() - start) * 1000
+        _current_span.reset(token)
+        env['learning.agreement.metric']._record_run(
+            operation, duration_ms, env.cr.sql_log_count - queries_before, span, error, profiler, threshold_ms, persist)
+
+
+def instrumented(operation, persist=True):
+    """Decorator recording every call of a model method or controller route
+    as a run of ``operation``.
+
+    Frequent calls such as portal routes pass ``persist=False`` so that only
+    their failed or slow runs take a row in ``learning.agreement.metric``.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            is_model = isinstance(self, models.BaseModel)
+            env = self.env if is_model else request.env
+            with metric_span(env, operation, records=len(self) if is_model else 0, persist=persist):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class LearningAgreementMetric(models.Model):
+    _name = 'learning.agreement.metric'
+    _description = 'Learning Agreement Operation Metric'
+    _order = 'id desc'
+
+    operation = fields.Char(string='Operation', required=True, index=True, readonly=True)
+    duration_ms = fields.Float(string='Duration (ms)', readonly=True, aggregator='avg')
+    query_count = fields.Integer(string='SQL Queries', readonly=True, aggregator='avg')
+    record_count = fields.Integer(string='Records', readonly=True)
+    failure_count = fields.Integer(string='Failed Records', readonly=True)
+    cache_hit_count = fields.Integer(string='Cached Records', readonly=True,
+                                     help='Records served from a previous result instead of being processed again.')
+    error = fields.Char(string='Error', readonly=True)
+    profile = fields.Binary(string='Profile', attachment=True, readonly=True,
+                            help='cProfile dump (open with pstats or snakeviz)')
+    profile_filename = fields.Char(readonly=True)
+
+    @api.model
+    def _record_run(self, operation, duration_ms, query_count, span, error, profiler, threshold_ms, persist=True):
+        """Log a run and store it when needed. Never queries the measured
+        transaction's cursor, which may be aborted when the run failed."""
+        _logger.info(
+            'learning_agreement_metric operation=%s duration_ms=%.1f queries=%s records=%s failures=%s error=%s',
+            operation, duration_ms, query_count, span.records, span.failures, error or '',
+        )
+        slow = duration_ms >= threshold_ms
+        if not (persist or error or slow):
+            return
+        vals = {
+            'operation': operation,
+            'duration_ms': duration_ms,
+            'query_count': query_count,
+            'record_count': span.records,
+            'failure_count': span.failures,
+            'cache_hit_count': span.cache_hits,
+            'error': error and error[:500],
+        }
+        try:
+            with self._metric_cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                if profiler and slow:
+                    profiler.create_stats()
+                    vals.update(
+                        profile=base64.b64encode(marshal.dumps(profiler.stats)),
+                        profile_filename=f"{operation}.prof",
+                    )
+                    # Profiling is meant for a single slow run
+                    env['ir.config_parameter'].set_param(PROFILING_PARAM, False)
+                env[self._name].create(vals)
+        except Exception:
+            _logger.warning('Could not store metric for %s', operation, exc_info=True)
+
+    @contextmanager
+    def _metric_cursor(self):
+        """Yield the cursor runs are stored with: a cursor of its own, so the
+        run is kept even when the measured transaction rolls back. Tests that
+        do not put the registry in test mode would commit that cursor past
+        their rollback, so they store the run in their own transaction."""
+        registry = self.env.registry
+        if registry.in_test_mode() or not getattr(threading.current_thread(), 'testing', False):
+            with registry.cursor() as cr:
+                yield cr
+        else:
+            with self.env.cr.savepoint():
+                yield self.env.cr
+
+    @api.model
+    def _get_operation_stats(self):
+        """Return per-operation statistics over the last runs kept."""
+        history = int(self.env['ir.config_parameter'].sudo().get_param(METRIC_HISTORY_PARAM, DEFAULT_METRIC_HISTORY))
+        self.flush_model()
+        self.env.cr.execute(f"""
+            SELECT operation,
+                   COUNT(*),
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms),
+                   AVG(query_count),
+                   COUNT(*) FILTER (WHERE error IS NOT NULL OR failure_count > 0)
+              FROM (
+                    SELECT *, row_number() OVER (PARTITION BY operation ORDER BY id DESC) AS rank
+                      FROM {self._table}
+                   ) runs
+             WHERE rank <= %s
+          GROUP BY operation
+          ORDER BY operation
+        """, [history])
+        return [{
+            'operation': operation,
+            'runs': runs,
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'avg_queries': avg_queries,
+            'failed_runs': failed,
+        } for operation, runs, p50, p95, avg_queries, failed in self.env.cr.fetchall()]
+
+    @api.model
+    def _get_cache_stats(self, operation):
+        """Return ``(hits, misses)`` of ``operation`` over the runs kept."""
+        self.flush_model()
+        self.env.cr.execute(f"""
+            SELECT COALESCE(SUM(cache_hit_count), 0),
+                   COALESCE(SUM(record_count - COALESCE(cache_hit_count, 0)), 0)
+              FROM {self._table}
+             WHERE operation = %s AND error IS NULL
+        """, [operation])
+        return self.env.cr.fetchone()
+
+    @api.model
+    def _get_operation_stats_html(self):
+        stats = self._get_operation_stats()
+        if not stats:
+            return Markup('<p class="text-muted">%s</p>') % _('No runs recorded yet.')
+        rows = Markup('').join(
+            Markup('<tr><td>%s</td><td>%s</td><td>%.0f</td><td>%.0f</td><td>%.0f</td><td>%s</td></tr>') % (
+                escape(stat['operation']), stat['runs'], stat['p50_ms'], stat['p95_ms'],
+                stat['avg_queries'] or 0, stat['failed_runs'],
+            )
+            for stat in stats
+        )
+        header = Markup('<tr><th>%s</th><th>%s</th><th>%s</th><th>%s</th><th>%s</th><th>%s</th></tr>') % (
+            _('Operation'), _('Runs'), _('p50 (ms)'), _('p95 (ms)'), _('Avg. Queries'), _('Failed Runs'))
+        return Markup('<table class="table table-sm"><thead>%s</thead><tbody>%s</tbody></table>') % (header, rows)
+
+    @api.autovacuum
+    def _gc_old_metrics(self):
+        """Keep only the last runs of each operation."""
+        history = int(self.env['ir.config_parameter'].sudo().get_param(METRIC_HISTORY_PARAM, DEFAULT_METRIC_HISTORY))
+        self.env.cr.execute(f"""
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY operation ORDER BY id DESC) AS rank
+                  FROM {self._table}
+            ) runs
+             WHERE rank > %s
+        """, [history])
+        self.browse([row[0] for row in self.env.cr.fetchall()]).unlink()
@@ -0,0 +1,51 @@
+from odoo import fields, models
+from odoo.tools.sql import drop_view_if_exists
+
+
+class LearningAgreementReport(models.Model):
+    _name = 'learning.agreement.report'
+    _description = 'Learning Agreement Signature Overview'
+    _auto = False
+    _order = 'signature_sent_date desc, id desc'
+
+    agreement_id = fields.Many2one('learning.agreement', string='Agreement', readonly=True)
+    name = fields.Char(string='Agreement Reference', readonly=True)
+    student_partner_id = fields.Many2one('res.partner', string='Student', readonly=True)
+    coordinator_partner_id = fields.Many2one('res.partner', string='Coordinator', readonly=True)
+    state = fields.Selection(selection=lambda self: self.env['learning.agreement']._fields['state'].selection,
+                             string='Status', readonly=True)
+    signature_status = fields.Selection(
+        selection=lambda self: self.env['learning.agreement']._fields['signature_status'].selection,
+        string='Signature Status', readonly=True)
+    signature_pending_role = fields.Selection(
+        selection=lambda self: self.env['learning.agreement']._fields['signature_pending_role'].selection,
+        string='Waiting For', readonly=True)
+    mobility_period = fields.Char(string='Academic Year', readonly=True)
+    signature_sent_date = fields.Datetime(string='Signature Sent On', readonly=True)
+    days_waiting = fields.Integer(string='Days Waiting', readonly=True, aggregator='avg')
+    agreement_count = fields.Integer(string='# Agreements', readonly=True)
+
+    def init(self):
+        # A plain view over stored, indexed columns: always current, and every
+        # dashboard count is a single aggregate query
+        drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT la.id AS id,
+                       la.id AS agreement_id,
+                       la.name AS name,
+                       la.student_partner_id AS student_partner_id,
+                       la.coordinator_partner_id AS coordinator_partner_id,
+                       la.state AS state,
+                       la.signature_status AS signature_status,
+                       la.signature_pending_role AS signature_pending_role,
+                       la.mobility_period AS mobility_period,
+                       la.signature_sent_date AS signature_sent_date,
+                       CASE WHEN la.state = 'sent' AND la.signature_sent_date IS NOT NULL
+                            THEN CURRENT_DATE - la.signature_sent_date::date
+                       END AS days_waiting,
+                       1 AS agreement_count
+                  FROM learning_agreement la
+                 WHERE la.active
+            )
+        """)
@@ -5,16 +5,56 @@ class ResConfigSettings(models.TransientModel):
     _inherit = 'res.config.settings'
 
     coordinator_partner_id = fields.Many2one('res.partner', string='Default Coordinator')
+    la_reminder_schedule = fields.Char(string='Reminder Schedule',
+                                       help='Comma-separated delays in days before each signature reminder; the last one repeats.')
+    la_reminder_batch_limit = fields.Integer(string='Reminders per Run')
+    la_archive_retention_days = fields.Integer(string='Archive After (days)',
+                                               help='Days after the end of the mobility before a signed or cancelled agreement is archived.')
+    la_tracking_mode = fields.Selection([
+        ('full', 'Chatter Tracking'),
+        ('audit', 'Audit Log'),
+    ], string='Change Tracking', default='full',
+        help='Chatter Tracking posts a tracking message per change. Audit Log records one compact entry per save instead.')
+    la_job_concurrency = fields.Integer(string='Concurrent Mail Jobs',
+                                        help='Maximum number of invitation, signature and reminder jobs running at the same time.')
+    la_profiling_enabled = fields.Boolean(string='Profile Next Slow Run',
+                                          help='Capture a cProfile dump of the next instrumented run slower than the threshold.')
+    la_profiling_threshold_ms = fields.Integer(string='Slow Run Threshold (ms)')
+    la_metric_history = fields.Integer(string='Runs Kept per Operation')
+    la_metric_stats = fields.Html(string='Operation Timings', readonly=True, sanitize=False)
+    la_pdf_cache_hits = fields.Integer(string='Contract Renders Avoided', readonly=True)
+    la_pdf_cache_misses = fields.Integer(string='Contract Renders', readonly=True)
 
     def set_values(self):
         super().set_values()
         icp = self.env['ir.config_parameter'].sudo()
         icp.set_param('sm_learning_agreement.coordinator_partner_id', self.coordinator_partner_id.id or False)
+        icp.set_param('sm_learning_agreement.reminder_schedule', self.la_reminder_schedule or False)
+        icp.set_param('sm_learning_agreement.reminder_batch_limit', self.la_reminder_batch_limit or False)
+        icp.set_param('sm_learning_agreement.archive_retention_days', self.la_archive_retention_days or False)
+        icp.set_param('sm_learning_agreement.tracking_mode', self.la_tracking_mode or False)
+        icp.set_param('sm_learning_agreement.job_concurrency', self.la_job_concurrency or False)
+        icp.set_param('sm_learning_agreement.profiling_enabled', self.la_profiling_enabled or False)
+        icp.set_param('sm_learning_agreement.profiling_threshold_ms', self.la_profiling_threshold_ms or False)
+        icp.set_param('sm_learning_agreement.metric_history', self.la_metric_history or False)
 
     @api.model
     def get_values(self):
         res = super().get_values()
         icp = self.env['ir.config_parameter'].sudo()
         partner_id = icp.get_param('sm_learning_agreement.coordinator_partner_id')
-        res.update(coordinator_partner_id=int(partner_id) if partner_id else False)
+        res.update(
+            coordinator_partner_id=int(partner_id) if partner_id else False,
+            la_reminder_schedule=icp.get_param('sm_learning_agreement.reminder_schedule', '7,7,14'),
+            la_reminder_batch_limit=int(icp.get_param('sm_learning_agreement.reminder_batch_limit', 200)),
+            la_archive_retention_days=int(icp.get_param('sm_learning_agreement.archive_retention_days', 365)),
+            la_tracking_mode=icp.get_param('sm_learning_agreement.tracking_mode', 'full'),
+            la_job_concurrency=int(icp.get_param('sm_learning_agreement.job_concurrency', 50)),
+            la_profiling_enabled=bool(icp.get_param('sm_learning_agreement.profiling_enabled')),
+            la_profiling_threshold_ms=int(icp.get_param('sm_learning_agreement.profiling_threshold_ms', 5000)),
+            la_metric_history=int(icp.get_param('sm_learning_agreement.metric_history', 200)),
+            la_metric_stats=self.env['learning.agreement.metric']._get_operation_stats_html(),
+        )
+        res['la_pdf_cache_hits'], res['la_pdf_cache_misses'] = \
+            self.env['learning.agreement.metric']._get_cache_stats('render_contract_pdfs')
         return res
\ No newline at end of file
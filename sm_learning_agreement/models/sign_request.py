@@ -0,0 +1,21 @@
+from odoo import fields, models
+from odoo.tools.sql import create_index
+
+
+class SignRequest(models.Model):
+    _inherit = 'sign.request'
+
+    learning_agreement_ids = fields.One2many('learning.agreement', 'sign_request_id', string='Learning Agreements')
+
+    def _auto_init(self):
+        res = super()._auto_init()
+        # Signature sync cron: requests written since its previous run
+        create_index(self._cr, 'sign_request_write_date_index', self._table, ['write_date'])
+        return res
+
+    def write(self, vals):
+        result = super().write(vals)
+        # Push final sign states to the linked agreements right away
+        if 'state' in vals:
+            self.sudo().learning_agreement_ids._sync_signature_state()
+        return result
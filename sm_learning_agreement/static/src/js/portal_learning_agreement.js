@@ -0,0 +1,123 @@
+/** @odoo-module **/
+
+import publicWidget from "@web/legacy/js/public/public_widget";
+import { rpc } from "@web/core/network/rpc";
+import { _t } from "@web/core/l10n/translation";
+
+// Delay between two checks for new chat messages
+const POLL_DELAY = 15000;
+
+publicWidget.registry.LearningAgreementPortal = publicWidget.Widget.extend({
+    selector: ".o_learning_agreement_portal",
+    events: {
+        "submit .o_la_form": "_onSubmitForm",
+        "submit .o_la_chat_form": "_onSubmitMessage",
+    },
+
+    init() {
+        this._super(...arguments);
+        this.notification = this.bindService("notification");
+    },
+
+    start() {
+        this.agreementId = this.el.dataset.agreementId;
+        this.accessToken = this.el.dataset.accessToken;
+        this.lastMessageId = parseInt(this.el.dataset.lastMessageId || 0);
+        this.pollTimer = setInterval(() => this._fetchMessages(), POLL_DELAY);
+        return this._super(...arguments);
+    },
+
+    destroy() {
+        clearInterval(this.pollTimer);
+        this._super(...arguments);
+    },
+
+    //--------------------------------------------------------------------------
+    // Handlers
+    //--------------------------------------------------------------------------
+
+    async _onSubmitForm(ev) {
+        ev.preventDefault();
+        const values = Object.fromEntries(new FormData(ev.currentTarget));
+        delete values.access_token;
+        const status = this.el.querySelector(".o_la_form_status");
+        let result;
+        try {
+            result = await rpc(`/my/learning-agreement/${this.agreementId}/save`, {
+                access_token: this.accessToken,
+                values,
+            });
+        } catch {
+            if (status) {
+                status.textContent = _t("Your changes could not be saved. Please try again.");
+            }
+            return;
+        }
+        if (status) {
+            status.textContent = result.changed.length ? _t("Saved.") : _t("No changes.");
+        }
+        await this._fetchMessages();
+    },
+
+    async _onSubmitMessage(ev) {
+        ev.preventDefault();
+        const textarea = ev.currentTarget.querySelector("textarea[name='message']");
+        const message = textarea.value.trim();
+        if (!message) {
+            return;
+        }
+        let result;
+        try {
+            result = await rpc(`/my/learning-agreement/${this.agreementId}/chat/post`, {
+                access_token: this.accessToken,
+                message,
+            });
+        } catch {
+            this.notification.add(_t("Your message could not be sent. Please try again."), {
+                type: "danger",
+            });
+            return;
+        }
+        textarea.value = "";
+        this._appendMessages(result.messages);
+    },
+
+    //--------------------------------------------------------------------------
+    // Private
+    //--------------------------------------------------------------------------
+
+    async _fetchMessages() {
+        let result;
+        try {
+            result = await rpc(`/my/learning-agreement/${this.agreementId}/chat/fetch`, {
+                access_token: this.accessToken,
+                after_id: this.lastMessageId,
+            }, { silent: true });
+        } catch {
+            // Polling is retried on the next tick
+            return;
+        }
+        this._appendMessages(result.messages);
+    },
+
+    _appendMessages(messages) {
+        const list = this.el.querySelector(".o_la_messages");
+        for (const message of messages) {
+            if (message.id <= this.lastMessageId) {
+                continue;
+            }
+            this.lastMessageId = message.id;
+            const item = document.createElement("div");
+            item.className = "list-group-item";
+            const header = document.createElement("div");
+            header.className = "small text-muted";
+            header.textContent = `${message.author} - ${message.date}`;
+            const body = document.createElement("div");
+            // Bodies are sanitized by the mail module
+            body.innerHTML = message.body;
+            item.append(header, body);
+            // Newest messages are listed first
+            list.prepend(item);
+        }
+    },
+});
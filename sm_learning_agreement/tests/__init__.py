@@ -0,0 +1,9 @@
+from . import test_learning_agreement_archive
+from . import test_learning_agreement_benchmark
+from . import test_learning_agreement_create
+from . import test_learning_agreement_import
+from . import test_learning_agreement_job
+from . import test_learning_agreement_render
+from . import test_learning_agreement_tracking
+from . import test_learning_agreement_write
+from . import test_portal
@@ -0,0 +1,166 @@
+from odoo.addons.base.models.ir_actions_report import IrActionsReport
+from odoo.addons.sign.models.sign_request import SignRequestItem
+from odoo.tests.common import TransactionCase
+from contextlib import contextmanager
+from unittest.mock import patch
+import io
+import json
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+
+_logger = logging.getLogger(__name__)
+
+# Directory the benchmark reports are written to, one JSON file per test
+# class; defaults to the temporary directory
+BENCHMARK_REPORT_DIR_ENV = 'LA_BENCHMARK_REPORT_DIR'
+# Set to measure peak memory instead of wall time: tracing allocations slows
+# the measured code down, so both are measured in separate runs
+BENCHMARK_MEMORY_ENV = 'LA_BENCHMARK_MEMORY'
+# Directory of the reports of a previous run, e.g. of the base commit: no
+# step may then run more queries than it did in that run
+BENCHMARK_BASELINE_DIR_ENV = 'LA_BENCHMARK_BASELINE_DIR'
+
+
+def _outlined_pdf(page_count):
+    """Return ``page_count`` blank pages, each with a top-level outline, as
+    wkhtmltopdf prints one article per record: reports split such a PDF
+    per record on its outlines."""
+    pages = range(page_count)
+    # Catalog, page tree, outline root and named destinations come first,
+    # then the pages and their outline items
+    first_page, first_item = 5, 5 + page_count
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R /Outlines 3 0 R /Dests 4 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{first_page + index} 0 R' for index in pages)}] /Count {page_count} >>",
+        f"<< /Type /Outlines /First {first_item} 0 R /Last {first_item + page_count - 1} 0 R /Count {page_count} >>",
+        f"<< {' '.join(f'/article{index} [{index} /XYZ null null null]' for index in pages)} >>",
+    ]
+    objects += ["<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << >> >>" for _index in pages]
+    for index in pages:
+        siblings = (f" /Prev {first_item + index - 1} 0 R" if index else '') + (
+            f" /Next {first_item + index + 1} 0 R" if index + 1 < page_count else '')
+        objects.append(f"<< /Title (Article {index}) /Parent 3 0 R /Dest /article{index}{siblings} >>")
+    stream = io.BytesIO()
+    stream.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(stream.tell())
+        stream.write(f"{number} 0 obj\n{body}\nendobj\n".encode())
+    xref = stream.tell()
+    stream.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        stream.write(f"{offset:010d} 00000 n \n".encode())
+    stream.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return stream.getvalue()
+
+
+class LearningAgreementCommon(TransactionCase):
+    """Learning agreements without wkhtmltopdf or outgoing sign mails:
+    reports render to one blank, outlined page per record and sign access
+    mails are only counted."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Tests otherwise get the HTML of qweb-pdf reports
+        cls.env = cls.env(context=dict(cls.env.context, force_report_rendering=True))
+        cls.startClassPatcher(patch.object(
+            IrActionsReport, '_run_wkhtmltopdf', lambda self, bodies, *args, **kwargs: _outlined_pdf(len(bodies))))
+        cls.sign_mail_item_ids = []
+        cls.startClassPatcher(patch.object(
+            SignRequestItem, '_send_signature_access_mail',
+            lambda items, *args, **kwargs: cls.sign_mail_item_ids.extend(items.ids)))
+        cls.coordinator = cls.env['res.partner'].create({
+            'name': 'International Coordinator',
+            'email': 'coordinator@example.com',
+        })
+        cls.env['ir.config_parameter'].sudo().set_param(
+            'sm_learning_agreement.coordinator_partner_id', cls.coordinator.id)
+
+    @classmethod
+    def _create_students(cls, count, prefix='student'):
+        return cls.env['res.partner'].create([{
+            'name': f"Student {prefix} {index}",
+            'email': f"{prefix}.{index}@example.com",
+        } for index in range(count)])
+
+    @classmethod
+    def _prepare_agreement_vals(cls, students):
+        return [{
+            'student_partner_id': student.id,
+            'student_full_name': student.name,
+            'student_email': student.email,
+            'host_org_name': 'Host University',
+        } for student in students]
+
+
+class LearningAgreementBenchmarkMixin:
+    """Measure steps with ``_benchmark`` and write the results as JSON once
+    the test class is done, to ``<report directory>/<class name>.json``."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.benchmark_results = []
+        cls.benchmark_baseline = cls._read_benchmark_baseline()
+        cls.addClassCleanup(cls._write_benchmark_report)
+
+    @classmethod
+    def _read_benchmark_baseline(cls):
+        """Return {(test, step): queries} of the baseline report of the class."""
+        directory = os.environ.get(BENCHMARK_BASELINE_DIR_ENV)
+        path = directory and os.path.join(directory, f"{cls.__name__}.json")
+        if not path or not os.path.exists(path):
+            return {}
+        with open(path) as report:
+            return {(result['test'], result['step']): result['queries'] for result in json.load(report)}
+
+    @classmethod
+    def _write_benchmark_report(cls):
+        if not cls.benchmark_results:
+            return
+        directory = os.environ.get(BENCHMARK_REPORT_DIR_ENV) or tempfile.gettempdir()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{cls.__name__}.json")
+        with open(path, 'w') as report:
+            json.dump(cls.benchmark_results, report, indent=2)
+        _logger.info('Learning agreement benchmark written to %s', path)
+
+    @contextmanager
+    def _benchmark(self, step, size, max_queries):
+        """Assert the SQL queries of the block stay within ``max_queries`` and
+        record them with the wall time, or with the peak Python memory when
+        ``$LA_BENCHMARK_MEMORY`` is set. With a baseline report, the block
+        may not run more queries than in the baseline either."""
+        trace_memory = bool(os.environ.get(BENCHMARK_MEMORY_ENV))
+        self.env.flush_all()
+        queries_before = self.cr.sql_log_count
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            with self.assertQueryCount(max_queries):
+                yield
+        finally:
+            duration = time.perf_counter() - start
+            peak = None
+            if trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self.benchmark_results.append({
+                'test': self._testMethodName,
+                'step': step,
+                'records': size,
+                'queries': self.cr.sql_log_count - queries_before,
+                'max_queries': max_queries,
+                'duration_ms': None if trace_memory else round(duration * 1000, 1),
+                'peak_memory_kb': round(peak / 1024) if trace_memory else None,
+            })
+        baseline = self.benchmark_baseline.get((self._testMethodName, step))
+        if baseline is not None:
+            self.assertLessEqual(
+                self.benchmark_results[-1]['queries'], baseline,
+                f"{step} ran more queries than in the baseline report")
@@ -0,0 +1,80 @@
+from odoo import fields
+from odoo.tests import tagged
+from datetime import timedelta
+from .common import LearningAgreementCommon, _outlined_pdf
+import base64
+
+
+@tagged('post_install', '-at_install')
+class TestLearningAgreementArchive(LearningAgreementCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        today = fields.Date.today()
+        cls.agreement, cls.recent, cls.unsigned = cls.env['learning.agreement'].create([
+            dict(vals, mobility_end_date=end_date)
+            for vals, end_date in zip(cls._prepare_agreement_vals(cls._create_students(3)), (
+                today - timedelta(days=400), today - timedelta(days=30), today - timedelta(days=400),
+            ))
+        ])
+        cls.agreement._render_contract_pdfs()
+        (cls.agreement | cls.recent).write({'state': 'signed'})
+        # Post the state tracking messages
+        cls.env.cr.flush()
+        cls.pdf = base64.b64encode(_outlined_pdf(1))
+
+    def _attach(self, name):
+        return self.env['ir.attachment'].create({
+            'name': name,
+            'datas': self.pdf,
+            'res_model': self.agreement._name,
+            'res_id': self.agreement.id,
+            'mimetype': 'application/pdf',
+        })
+
+    def test_archive_keeps_uploads_and_used_contracts(self):
+        generated_name = f"{self.agreement.name}_Learning_Agreement.pdf"
+        superseded = self._attach(generated_name)
+        signed_elsewhere = self._attach(generated_name)
+        self.env['sign.template'].create({'attachment_id': signed_elsewhere.id})
+        posted = self._attach(generated_name)
+        self.agreement.message_post(body='Previous version', attachment_ids=posted.ids)
+        uploaded = self._attach('Transcript_of_Records.pdf')
+        current = self.agreement.contract_attachment_id
+        orphan_template = self.env['sign.template'].create({'attachment_id': self._attach('Orphan.pdf').id})
+        self.agreement.sign_template_id = orphan_template
+
+        self.env['learning.agreement'].cron_archive_agreements()
+
+        self.assertFalse(self.agreement.active)
+        self.assertFalse(superseded.exists())
+        self.assertEqual((current | signed_elsewhere | posted | uploaded).exists(), current | signed_elsewhere | posted | uploaded)
+        self.assertFalse(orphan_template.exists())
+
+    def test_archive_keeps_comments_and_notes(self):
+        comment = self.agreement.message_post(body='Please sign', message_type='comment', subtype_xmlid='mail.mt_comment')
+        note = self.agreement.message_post(body='Called the host', message_type='comment', subtype_xmlid='mail.mt_note')
+        tracking = self.env['mail.message'].search([
+            ('model', '=', self.agreement._name),
+            ('res_id', '=', self.agreement.id),
+            ('tracking_value_ids', '!=', False),
+        ])
+        self.assertTrue(tracking)
+
+        self.env['learning.agreement'].cron_archive_agreements()
+
+        self.assertFalse(tracking.exists())
+        self.assertEqual((comment | note).exists(), comment | note)
+
+    def test_retention(self):
+        self.env['learning.agreement'].cron_archive_agreements()
+        self.assertFalse(self.agreement.active)
+        # Mobility ended within the retention period, or not signed
+        self.assertTrue(self.recent.active)
+        self.assertTrue(self.unsigned.active)
+
+        self.env['ir.config_parameter'].sudo().set_param('sm_learning_agreement.archive_retention_days', 10)
+        self.env['learning.agreement'].cron_archive_agreements()
+        self.assertFalse(self.recent.active)
+        self.assertTrue(self.unsigned.active)
@@ -0,0 +1,112 @@
+from odoo import fields
+from odoo.addons.base.models.ir_actions_report import IrActionsReport
+from odoo.tests import HttpCase, tagged
+from unittest.mock import patch
+from .common import LearningAgreementBenchmarkMixin, LearningAgreementCommon
+
+# SQL query budget of each lifecycle step: (fixed part, part per agreement).
+# Batched steps get a fixed bound, as in test_create_1000. Only creating the
+# portal users with their signup mail, the sign templates and requests, and
+# running one job per agreement still cost queries per record.
+LIFECYCLE_QUERY_BUDGETS = {
+    'create': (150, 0),
+    'portal_invite': (100, 20),
+    'portal_save': (120, 0),
+    'render_contract_pdfs': (150, 0),
+    'send_for_signature': (250, 25),
+    'cron_send_overdue_signature_reminders': (80, 0),
+    'cron_run_jobs': (50, 20),
+    'cron_sync_signature_state': (150, 0),
+}
+
+
+@tagged('post_install', '-at_install', '-standard', 'la_benchmark')
+class TestLearningAgreementLifecycleBenchmark(LearningAgreementBenchmarkMixin, LearningAgreementCommon, HttpCase):
+    """Run the agreement lifecycle on 10, 100 and 1,000 agreements.
+
+    Run with ``--test-tags la_benchmark``; the JSON reports are written to
+    ``$LA_BENCHMARK_REPORT_DIR`` or the temporary directory. Run again with
+    ``LA_BENCHMARK_MEMORY=1`` for peak memory.
+    """
+
+    def _run_lifecycle(self, size):
+        icp = self.env['ir.config_parameter'].sudo()
+        icp.set_param('sm_learning_agreement.reminder_batch_limit', size)
+        # A signature request and a reminder job per agreement, run at once
+        icp.set_param('sm_learning_agreement.job_concurrency', 2 * size)
+        self.sign_mail_item_ids.clear()
+        students = self._create_students(size, prefix=f"lifecycle{size}")
+
+        def budget(step):
+            fixed, per_record = LIFECYCLE_QUERY_BUDGETS[step]
+            return fixed + per_record * size
+
+        with self._benchmark('create', size, budget('create')):
+            agreements = self.env['learning.agreement'].create(self._prepare_agreement_vals(students))
+
+        with self._benchmark('portal_invite', size, budget('portal_invite')):
+            users = agreements._invite_students_to_portal()
+        self.assertEqual(len(users), size)
+
+        agreement = agreements[0]
+        with self._benchmark('portal_save', size, budget('portal_save')):
+            result = self.make_jsonrpc_request(f"/my/learning-agreement/{agreement.id}/save", {
+                'access_token': agreement.access_token,
+                'values': {'student_phone': '+32 470 00 00 00', 'student_city': 'Brussels'},
+            })
+        self.assertEqual(result['changed'], ['student_city', 'student_phone'])
+        agreement.invalidate_recordset()
+        self.assertEqual(agreement.student_city, 'Brussels')
+
+        with patch.object(IrActionsReport, '_render_qweb_pdf', autospec=True,
+                          side_effect=IrActionsReport._render_qweb_pdf) as render_one, \
+                self._benchmark('render_contract_pdfs', size, budget('render_contract_pdfs')):
+            agreements._render_contract_pdfs()
+        # One pass split on the outlines, no rendering agreement by agreement
+        render_one.assert_not_called()
+        self.assertEqual(len(agreements.contract_attachment_id), size)
+
+        with self._benchmark('send_for_signature', size, budget('send_for_signature')):
+            agreements.action_send_for_signature()
+        self.assertEqual(set(agreements.mapped('state')), {'sent'})
+        # Signers are only mailed by the job runner
+        self.assertFalse(self.sign_mail_item_ids)
+
+        agreements.write({'reminder_next_date': fields.Date.today()})
+        with self._benchmark('cron_send_overdue_signature_reminders', size,
+                             budget('cron_send_overdue_signature_reminders')):
+            self.env['learning.agreement'].cron_send_overdue_signature_reminders()
+        reminder_jobs = agreements.job_ids.filtered(lambda job: job.job_type == 'signature_reminder')
+        self.assertEqual(len(reminder_jobs), size)
+
+        with self._benchmark('cron_run_jobs', size, budget('cron_run_jobs')):
+            self.env['learning.agreement.job'].cron_run_jobs()
+        self.assertEqual(len(agreements.job_ids), 2 * size)
+        self.assertEqual(set(agreements.job_ids.mapped('state')), {'done'})
+        # The student signs first: the request and the reminder both mail
+        # the student's item, the coordinator is not invited yet
+        student_items = agreements.sign_request_id.request_item_ids.filtered(
+            lambda item: item.partner_id in agreements.student_partner_id)
+        self.assertEqual(sorted(self.sign_mail_item_ids), sorted(student_items.ids * 2))
+        self.assertEqual(set(agreements.mapped('reminder_count')), {1})
+
+        # Sign the requests behind the ORM's back, as a lost push would
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE sign_request SET state = 'signed' WHERE id IN %s",
+            [tuple(agreements.sign_request_id.ids)],
+        )
+        self.env.invalidate_all()
+        with self._benchmark('cron_sync_signature_state', size, budget('cron_sync_signature_state')):
+            result = self.env['learning.agreement'].cron_sync_signature_state()
+        self.assertEqual(result['transitioned'], size)
+        self.assertEqual(set(agreements.mapped('state')), {'signed'})
+
+    def test_lifecycle_10(self):
+        self._run_lifecycle(10)
+
+    def test_lifecycle_100(self):
+        self._run_lifecycle(100)
+
+    def test_lifecycle_1000(self):
+        self._run_lifecycle(1000)
@@ -0,0 +1,40 @@
+from odoo.tests import new_test_user, tagged
+from .common import LearningAgreementBenchmarkMixin, LearningAgreementCommon
+
+
+@tagged('post_install', '-at_install')
+class TestLearningAgreementCreate(LearningAgreementCommon):
+
+    def test_followers_subtypes(self):
+        coordinator = new_test_user(self.env, login='la_coordinator', groups='base.group_user').partner_id
+        student = self._create_students(1)
+        agreement = self.env['learning.agreement'].create(dict(
+            self._prepare_agreement_vals(student)[0],
+            coordinator_partner_id=coordinator.id,
+        ))
+        all_subtypes, _internal, external = self.env['mail.message.subtype'].default_subtypes(agreement._name)
+        followers = {follower.partner_id: follower for follower in agreement.message_follower_ids}
+        self.assertEqual(followers[student].subtype_ids, external)
+        self.assertFalse(followers[student].subtype_ids.filtered('internal'))
+        self.assertEqual(followers[coordinator].subtype_ids, all_subtypes)
+
+    def test_create_batch_names(self):
+        students = self._create_students(3)
+        agreements = self.env['learning.agreement'].create(self._prepare_agreement_vals(students))
+        self.assertEqual(len(set(agreements.mapped('name'))), 3)
+        for agreement, student in zip(agreements, students):
+            self.assertIn(student, agreement.message_partner_ids)
+            self.assertIn(self.coordinator, agreement.message_partner_ids)
+
+
+@tagged('post_install', '-at_install', '-standard', 'la_benchmark')
+class TestLearningAgreementCreateBenchmark(LearningAgreementBenchmarkMixin, LearningAgreementCommon):
+
+    def test_create_1000(self):
+        vals_list = self._prepare_agreement_vals(self._create_students(1000))
+        # Sequence, insert, followers and creation messages are batched
+        with self._benchmark('create', 1000, 150):
+            agreements = self.env['learning.agreement'].create(vals_list)
+        self.assertEqual(len(agreements), 1000)
+        parties = agreements.message_follower_ids.filtered(lambda f: f.partner_id in agreements.student_partner_id | self.coordinator)
+        self.assertEqual(len(parties), 2000)
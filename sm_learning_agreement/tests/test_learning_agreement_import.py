@@ -0,0 +1,100 @@
+from odoo.addons.sm_learning_agreement.models.learning_agreement import LearningAgreement
+from odoo.addons.sm_learning_agreement.wizard.learning_agreement_import import openpyxl
+from odoo.exceptions import UserError
+from odoo.tests import new_test_user, tagged
+from unittest import skipUnless
+from unittest.mock import patch
+from .common import LearningAgreementCommon
+import base64
+import io
+
+
+@tagged('post_install', '-at_install')
+class TestLearningAgreementImport(LearningAgreementCommon):
+
+    def _import(self, content, filename='students.csv'):
+        if isinstance(content, str):
+            content = content.encode()
+        wizard = self.env['learning.agreement.import'].create({
+            'file': base64.b64encode(content),
+            'filename': filename,
+        })
+        wizard.action_import()
+        return wizard
+
+    def _report(self, wizard):
+        return [(line.row, line.email, line.status) for line in wizard.line_ids]
+
+    def test_bad_rows_reported(self):
+        new_test_user(self.env, login='internal@example.com', email='internal@example.com', groups='base.group_user')
+        new_test_user(self.env, login='archived@example.com', email='archived@example.com',
+                      groups='base.group_portal').active = False
+        wizard = self._import(
+            "name,email,mobility_start_date,host_org_name\n"
+            "Valid Student,valid@example.com,2026-09-01,Host University\n"
+            "Same Student,VALID@example.com,,\n"
+            "Internal User,internal@example.com,,\n"
+            "Bad Date,bad.date@example.com,first of September,\n"
+            "Archived User,archived@example.com,,\n"
+            "No Email,,,\n"
+        )
+        self.assertEqual(wizard.state, 'done')
+        self.assertEqual(self._report(wizard), [
+            (2, 'valid@example.com', 'done'),
+            (3, 'VALID@example.com', 'error'),
+            (4, 'internal@example.com', 'error'),
+            (5, 'bad.date@example.com', 'error'),
+            (6, 'archived@example.com', 'error'),
+            (7, '', 'error'),
+        ])
+        agreement = wizard.line_ids[0].agreement_id
+        self.assertRecordValues(agreement, [{
+            'student_full_name': 'Valid Student',
+            'student_email': 'valid@example.com',
+            'host_org_name': 'Host University',
+        }])
+        self.assertEqual(str(agreement.mobility_start_date), '2026-09-01')
+        self.assertTrue(agreement.student_partner_id.user_ids.share)
+        self.assertEqual(self.env['learning.agreement'].search_count([
+            ('student_email', 'in', ('internal@example.com', 'bad.date@example.com', 'archived@example.com')),
+        ]), 0)
+
+    def test_failing_row_imported_row_by_row(self):
+        invite = LearningAgreement._invite_students_to_portal
+
+        def invite_or_fail(agreements):
+            if 'broken@example.com' in agreements.mapped('student_email'):
+                raise UserError('Mail server refused the address')
+            return invite(agreements)
+
+        with patch.object(LearningAgreement, '_invite_students_to_portal', invite_or_fail):
+            wizard = self._import(
+                "name;email\n"
+                "First Student;first@example.com\n"
+                "Broken Student;broken@example.com\n"
+                "Second Student;second@example.com\n"
+            )
+        self.assertEqual(self._report(wizard), [
+            (2, 'first@example.com', 'done'),
+            (3, 'broken@example.com', 'error'),
+            (4, 'second@example.com', 'done'),
+        ])
+        self.assertIn('Mail server refused the address', wizard.line_ids[1].message)
+        # The failed batch left nothing behind
+        agreements = self.env['learning.agreement'].search([
+            ('student_email', 'in', ('first@example.com', 'broken@example.com', 'second@example.com')),
+        ])
+        self.assertEqual(sorted(agreements.mapped('student_email')), ['first@example.com', 'second@example.com'])
+        self.assertFalse(self.env['res.partner'].search([('email', '=', 'broken@example.com')]))
+
+    @skipUnless(openpyxl, 'openpyxl is not installed')
+    def test_xlsx(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(['Name', 'Email', 'Mobility_End_Date'])
+        sheet.append(['Sheet Student', 'sheet@example.com', '2027-01-31'])
+        content = io.BytesIO()
+        workbook.save(content)
+        wizard = self._import(content.getvalue(), filename='students.xlsx')
+        self.assertEqual(self._report(wizard), [(2, 'sheet@example.com', 'done')])
+        self.assertEqual(str(wizard.line_ids.agreement_id.mobility_end_date), '2027-01-31')
@@ -0,0 +1,113 @@
+from odoo import fields
+from odoo.addons.base.models.ir_mail_server import MailDeliveryException
+from odoo.addons.sign.models.sign_request import SignRequestItem
+from odoo.addons.sm_learning_agreement.models.learning_agreement_job import (
+    JOB_CONCURRENCY_PARAM, JOB_MAX_ATTEMPTS, JOB_RETRY_DELAY, JOB_STALE_DELAY,
+)
+from odoo.tests import new_test_user, tagged
+from unittest.mock import patch
+from .common import LearningAgreementCommon
+
+
+@tagged('post_install', '-at_install')
+class TestLearningAgreementJob(LearningAgreementCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.agreements = cls.env['learning.agreement'].create(cls._prepare_agreement_vals(cls._create_students(3)))
+        cls.agreements.action_send_for_signature()
+        cls.jobs = cls.agreements.job_ids
+
+    def setUp(self):
+        super().setUp()
+        self.sign_mail_item_ids.clear()
+
+    def _set_concurrency(self, cap):
+        self.env['ir.config_parameter'].sudo().set_param(JOB_CONCURRENCY_PARAM, cap)
+
+    def test_enqueue_skips_waiting_jobs(self):
+        self.assertEqual(len(self.jobs), 3)
+        self.assertEqual(set(self.jobs.mapped('job_type')), {'signature_request'})
+        Job = self.env['learning.agreement.job']
+        self.assertFalse(Job._enqueue(self.agreements, 'signature_request'))
+        # Another job type, or a job that is no longer waiting, does not block
+        self.assertEqual(len(Job._enqueue(self.agreements, 'signature_reminder')), 3)
+        self.jobs[0].write({'state': 'done'})
+        self.assertEqual(Job._enqueue(self.agreements, 'signature_request').agreement_id, self.jobs[0].agreement_id)
+
+    def test_run_mails_signers(self):
+        self.assertFalse(self.sign_mail_item_ids)
+        self.env['learning.agreement.job'].cron_run_jobs()
+        self.assertEqual(set(self.jobs.mapped('state')), {'done'})
+        self.assertEqual(set(self.jobs.mapped('attempts')), {1})
+        # Only the students, who sign first, are mailed
+        student_items = self.agreements.sign_request_id.request_item_ids.filtered(
+            lambda item: item.partner_id in self.agreements.student_partner_id)
+        self.assertEqual(sorted(self.sign_mail_item_ids), sorted(student_items.ids))
+
+    def test_run_as_queueing_user(self):
+        manager = new_test_user(
+            self.env, login='la_job_manager',
+            groups='base.group_user,sign.group_sign_manager,sm_learning_agreement.group_learning_agreement_manager',
+        )
+        self.jobs.write({'state': 'done'})
+        agreement = self.agreements[0]
+        job = self.env['learning.agreement.job'].with_user(manager)._enqueue(agreement, 'signature_reminder')
+        self.assertEqual(job.user_id, manager)
+        self.env['learning.agreement.job'].cron_run_jobs()
+        self.assertEqual(job.state, 'done')
+        # The chatter note is authored by the manager, not the cron user
+        self.assertEqual(agreement.message_ids[0].author_id, manager.partner_id)
+
+    def test_claim_within_concurrency_cap(self):
+        self._set_concurrency(2)
+        Job = self.env['learning.agreement.job']
+        claimed = Job._claim_jobs()
+        self.assertEqual(claimed, self.jobs.sorted('id')[:2])
+        self.assertEqual(set(claimed.mapped('state')), {'running'})
+        # Both slots are taken until the running jobs end
+        self.assertFalse(Job._claim_jobs())
+        claimed[0].write({'state': 'done'})
+        self.assertEqual(Job._claim_jobs(), self.jobs.sorted('id')[2])
+
+    def test_stale_running_job_requeued(self):
+        self._set_concurrency(1)
+        Job = self.env['learning.agreement.job']
+        stale = Job._claim_jobs()
+        self.assertFalse(Job._claim_jobs())
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE learning_agreement_job SET write_date = %s WHERE id = %s",
+            [fields.Datetime.now() - JOB_STALE_DELAY * 2, stale.id],
+        )
+        self.env.invalidate_all()
+        self.assertEqual(Job._claim_jobs(), stale)
+
+    def test_failed_send_retried_with_backoff(self):
+        job = self.jobs[0]
+        (self.jobs - job).write({'state': 'done'})
+        with patch.object(SignRequestItem, '_send_signature_access_mail',
+                          side_effect=MailDeliveryException('SMTP server unreachable')):
+            before = fields.Datetime.now()
+            self.env['learning.agreement.job'].cron_run_jobs()
+            self.assertRecordValues(job, [{'state': 'pending', 'attempts': 1}])
+            self.assertIn('SMTP server unreachable', job.error)
+            self.assertGreaterEqual(job.next_attempt_date, before + JOB_RETRY_DELAY)
+            # Not due yet
+            self.env['learning.agreement.job'].cron_run_jobs()
+            self.assertEqual(job.attempts, 1)
+
+            job.write({'next_attempt_date': before})
+            self.env['learning.agreement.job'].cron_run_jobs()
+            self.assertRecordValues(job, [{'state': 'pending', 'attempts': 2}])
+            self.assertGreaterEqual(job.next_attempt_date, before + JOB_RETRY_DELAY * 2)
+
+            job.write({'next_attempt_date': before, 'attempts': JOB_MAX_ATTEMPTS - 1})
+            self.env['learning.agreement.job'].cron_run_jobs()
+            self.assertRecordValues(job, [{'state': 'failed', 'attempts': JOB_MAX_ATTEMPTS}])
+        self.assertEqual(job.agreement_id.job_status, 'failed')
+
+        job.action_retry()
+        self.env['learning.agreement.job'].cron_run_jobs()
+        self.assertRecordValues(job, [{'state': 'done', 'attempts': 1, 'error': False}])
@@ -0,0 +1,33 @@
+from odoo.tests import tagged
+from .common import LearningAgreementCommon
+
+
+@tagged('post_install', '-at_install')
+class TestLearningAgreementRender(LearningAgreementCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.agreement = cls.env['learning.agreement'].create(cls._prepare_agreement_vals(cls._create_students(1)))
+        cls.agreement._render_contract_pdfs()
+        cls.contract = cls.agreement.contract_attachment_id
+
+    def test_unchanged_contract_kept(self):
+        self.agreement._render_contract_pdfs()
+        self.assertEqual(self.agreement.contract_attachment_id, self.contract)
+
+    def test_inheriting_view_renders_again(self):
+        self.env['ir.ui.view'].create({
+            'name': 'Learning agreement additional clause',
+            'type': 'qweb',
+            'inherit_id': self.env.ref('sm_learning_agreement.report_learning_agreement_document').id,
+            'arch': '<xpath expr="//h2" position="after"><p>Additional clause</p></xpath>',
+        })
+        self.agreement._render_contract_pdfs()
+        self.assertTrue(self.agreement.contract_attachment_id)
+        self.assertNotEqual(self.agreement.contract_attachment_id, self.contract)
+
+    def test_company_footer_renders_again(self):
+        self.env.company.report_footer = 'Erasmus+ office, open on weekdays'
+        self.agreement._render_contract_pdfs()
+        self.assertNotEqual(self.agreement.contract_attachment_id, self.contract)
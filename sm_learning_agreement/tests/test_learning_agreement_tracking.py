@@ -0,0 +1,69 @@
+from odoo.tests import tagged
+from .common import LearningAgreementBenchmarkMixin, LearningAgreementCommon
+
+TRACKING_TABLES = ('mail_message', 'mail_tracking_value', 'learning_agreement_audit')
+# The green fields a portal save writes
+PORTAL_SAVE_VALS = {
+    'student_full_name': 'Student Renamed',
+    'student_email': 'renamed@example.com',
+    'student_phone': '+32 470 00 00 00',
+    'student_street': 'Rue de la Loi 1',
+    'student_street2': 'Box 2',
+    'student_zip': '1000',
+    'student_city': 'Brussels',
+}
+
+
+@tagged('post_install', '-at_install')
+class TestLearningAgreementTracking(LearningAgreementCommon):
+
+    def test_audit_mode(self):
+        self.env['ir.config_parameter'].sudo().set_param('sm_learning_agreement.tracking_mode', 'audit')
+        agreement = self.env['learning.agreement'].create(self._prepare_agreement_vals(self._create_students(1)))
+        messages = agreement.message_ids
+        agreement.write(dict(PORTAL_SAVE_VALS, host_org_name='Host University'))
+        self.env.cr.flush()
+        self.assertEqual(agreement.message_ids, messages)
+        self.assertEqual(len(agreement.audit_ids), 1)
+        changes = agreement.audit_ids.changes
+        # Unchanged values are not recorded
+        self.assertEqual(set(changes), set(PORTAL_SAVE_VALS))
+        self.assertEqual(changes['student_city'], [False, 'Brussels'])
+
+
+@tagged('post_install', '-at_install', '-standard', 'la_benchmark')
+class TestLearningAgreementTrackingBenchmark(LearningAgreementBenchmarkMixin, LearningAgreementCommon):
+
+    def _count_rows(self):
+        self.env.cr.flush()
+        counts = {}
+        for table in TRACKING_TABLES:
+            self.env.cr.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = self.env.cr.fetchone()[0]
+        return counts
+
+    def _benchmark_mode(self, mode, size, max_queries):
+        self.env['ir.config_parameter'].sudo().set_param('sm_learning_agreement.tracking_mode', mode)
+        agreements = self.env['learning.agreement'].with_context(tracking_disable=True).create(
+            self._prepare_agreement_vals(self._create_students(size, prefix=mode)))
+        # Creation messages are skipped, the measured write is tracked as a portal save is
+        agreements = agreements.with_context(tracking_disable=False)
+        before = self._count_rows()
+        with self._benchmark(f"write_{mode}", size, max_queries):
+            agreements.write(PORTAL_SAVE_VALS)
+        after = self._count_rows()
+        rows = {table: after[table] - before[table] for table in TRACKING_TABLES}
+        self.benchmark_results[-1]['rows_created'] = rows
+        return rows
+
+    def test_tracking_modes_200(self):
+        # Mail tracking posts one message with its tracking values per record
+        full = self._benchmark_mode('full', 200, 100 + 15 * 200)
+        self.assertEqual(full['mail_message'], 200)
+        self.assertEqual(full['mail_tracking_value'], 200 * len(PORTAL_SAVE_VALS))
+        self.assertEqual(full['learning_agreement_audit'], 0)
+        # The audit log stores one entry per record and nothing in the chatter
+        audit = self._benchmark_mode('audit', 200, 100)
+        self.assertEqual(audit['mail_message'], 0)
+        self.assertEqual(audit['mail_tracking_value'], 0)
+        self.assertEqual(audit['learning_agreement_audit'], 200)
@@ -0,0 +1,59 @@
+from odoo.exceptions import AccessError
+from odoo.tests import new_test_user, tagged
+from .common import LearningAgreementBenchmarkMixin, LearningAgreementCommon
+
+
+@tagged('post_install', '-at_install')
+class TestLearningAgreementWriteAccess(LearningAgreementCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.student_user = new_test_user(cls.env, login='la_write_student', groups='base.group_portal')
+        cls.agreement = cls.env['learning.agreement'].create({'student_partner_id': cls.student_user.partner_id.id})
+        cls.other_agreement = cls.env['learning.agreement'].create(cls._prepare_agreement_vals(cls._create_students(1)))
+
+    def test_portal_write_permissions(self):
+        agreements = self.agreement.with_user(self.student_user)
+        agreements._check_portal_write_permissions({'student_city': 'Ghent'})
+        with self.assertRaises(AccessError):
+            agreements._check_portal_write_permissions({'host_org_name': 'Host'})
+        with self.assertRaises(AccessError):
+            (agreements | self.other_agreement.with_user(self.student_user))._check_portal_write_permissions(
+                {'student_city': 'Ghent'})
+
+
+@tagged('post_install', '-at_install', '-standard', 'la_benchmark')
+class TestLearningAgreementWriteBenchmark(LearningAgreementBenchmarkMixin, LearningAgreementCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.manager = new_test_user(
+            cls.env, login='la_write_manager',
+            groups='base.group_user,sm_learning_agreement.group_learning_agreement_manager')
+        cls.student_user = new_test_user(cls.env, login='la_bulk_student', groups='base.group_portal')
+        cls.agreements = cls.env['learning.agreement'].with_context(tracking_disable=True).create([
+            {'student_partner_id': cls.student_user.partner_id.id} for _index in range(5000)
+        ])
+
+    def test_permission_check_5000(self):
+        manager_agreements = self.agreements.with_user(self.manager)
+        # Fill the role cache
+        manager_agreements._check_portal_write_permissions({'state': 'ready'})
+        with self._benchmark('check_manager', 5000, 0):
+            manager_agreements._check_portal_write_permissions({'state': 'ready'})
+        portal_agreements = self.agreements.with_user(self.student_user)
+        portal_agreements._check_portal_write_permissions({'student_city': 'Ghent'})
+        # Ownership of the whole recordset is one query
+        with self._benchmark('check_portal', 5000, 1):
+            portal_agreements._check_portal_write_permissions({'student_city': 'Ghent'})
+
+    def test_bulk_write_5000(self):
+        # Without tracking, as crons and imports write, so the write itself is measured
+        agreements = self.agreements.with_user(self.manager).with_context(tracking_disable=True)
+        with self._benchmark('write_manager', 5000, 150):
+            agreements.write({'state': 'ready'})
+        with self._benchmark('write_superuser', 5000, 150):
+            self.agreements.with_context(tracking_disable=True).write({'state': 'student_input'})
+        self.assertEqual(set(self.agreements.mapped('state')), {'student_input'})
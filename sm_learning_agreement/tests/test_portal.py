@@ -0,0 +1,75 @@
+from odoo.addons.sm_learning_agreement.controllers import portal
+from odoo.tests import HttpCase, new_test_user, tagged
+from unittest.mock import patch
+from .common import LearningAgreementCommon
+
+
+@tagged('post_install', '-at_install')
+class TestLearningAgreementPortal(LearningAgreementCommon, HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.student_user = new_test_user(cls.env, login='la_portal_student', groups='base.group_portal')
+        cls.agreement = cls.env['learning.agreement'].create({
+            'student_partner_id': cls.student_user.partner_id.id,
+            'student_full_name': 'Portal Student',
+        })
+
+    def test_save_writes_changed_green_fields(self):
+        result = self.make_jsonrpc_request(f"/my/learning-agreement/{self.agreement.id}/save", {
+            'access_token': self.agreement.access_token,
+            'values': {
+                'student_full_name': 'Portal Student',
+                'student_city': 'Ghent',
+                'host_org_name': 'Not a green field',
+            },
+        })
+        self.assertEqual(result['changed'], ['student_city'])
+        self.agreement.invalidate_recordset()
+        self.assertEqual(self.agreement.student_city, 'Ghent')
+        self.assertFalse(self.agreement.host_org_name)
+
+    def test_chat_fetch_only_public_comments(self):
+        self.agreement.message_post(body='Internal note', message_type='comment', subtype_xmlid='mail.mt_note')
+        comment = self.agreement.message_post(body='Hello', message_type='comment', subtype_xmlid='mail.mt_comment')
+        result = self.make_jsonrpc_request(f"/my/learning-agreement/{self.agreement.id}/chat/fetch", {
+            'access_token': self.agreement.access_token,
+            'after_id': 0,
+        })
+        self.assertEqual([message['id'] for message in result['messages']], [comment.id])
+
+    def test_archived_agreement_not_found(self):
+        self.agreement.action_archive()
+        url = f"/my/learning-agreement/{self.agreement.id}"
+        response = self.url_open(f"{url}?access_token={self.agreement.access_token}", allow_redirects=False)
+        self.assertEqual(response.status_code, 404)
+        self.authenticate(self.student_user.login, self.student_user.login)
+        response = self.url_open(url, allow_redirects=False)
+        self.assertEqual(response.status_code, 404)
+
+    def test_rejected_access_not_stored_as_failure(self):
+        Metric = self.env['learning.agreement.metric']
+        runs = Metric.search_count([])
+        response = self.url_open(f"/my/learning-agreement/{self.agreement.id}?access_token=wrong", allow_redirects=False)
+        self.assertNotEqual(response.status_code, 200)
+        self.assertEqual(Metric.search_count([]), runs)
+
+    def test_owner_access_not_rate_limited(self):
+        url = f"/my/learning-agreement/{self.agreement.id}"
+        with patch.object(portal, '_token_rate_limiter', portal._FailureRateLimiter(max_failures=1)):
+            self.url_open(f"{url}?access_token=wrong", allow_redirects=False)
+            response = self.url_open(f"{url}?access_token=wrong", allow_redirects=False)
+            self.assertEqual(response.status_code, 429)
+            self.authenticate(self.student_user.login, self.student_user.login)
+            response = self.url_open(url, allow_redirects=False)
+            self.assertEqual(response.status_code, 200)
+
+    def test_agreement_list_pager(self):
+        self.env['learning.agreement'].with_context(tracking_disable=True).create([
+            {'student_partner_id': self.student_user.partner_id.id} for _index in range(80)
+        ])
+        self.authenticate(self.student_user.login, self.student_user.login)
+        response = self.url_open('/my/learning-agreements')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/my/learning-agreements/page/2', response.text)
@@ -0,0 +1 @@
+from . import learning_agreement_import
\ No newline at end of file
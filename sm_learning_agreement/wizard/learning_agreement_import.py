@@ -0,0 +1,196 @@
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+from odoo.tools import email_normalize
+import base64
+import csv
+import io
+import logging
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+_logger = logging.getLogger(__name__)
+
+# Optional yellow columns accepted in the spreadsheet, by field name
+IMPORT_TEXT_FIELDS = (
+    'learning_outcomes',
+    'host_org_name', 'host_org_street', 'host_org_street2', 'host_org_zip', 'host_org_city',
+    'host_responsible_name', 'host_responsible_email', 'host_responsible_phone',
+)
+IMPORT_DATE_FIELDS = ('mobility_start_date', 'mobility_end_date')
+
+
+class LearningAgreementImport(models.TransientModel):
+    _name = 'learning.agreement.import'
+    _description = 'Learning Agreement Student Import'
+
+    file = fields.Binary(string='File', required=True,
+                         help='CSV or XLSX file with a "name" and an "email" column. '
+                              'Yellow field columns (e.g. mobility_start_date, host_org_name) are optional.')
+    filename = fields.Char(string='File Name')
+    invite_to_portal = fields.Boolean(string='Create Portal Users', default=True)
+    send_form_link = fields.Boolean(string='Send Form Link', default=True)
+    state = fields.Selection([('upload', 'Upload'), ('done', 'Done')], default='upload')
+    line_ids = fields.One2many('learning.agreement.import.line', 'wizard_id', string='Report', readonly=True)
+
+    def _read_rows(self):
+        """Return the spreadsheet rows as dicts keyed by lowercase header."""
+        self.ensure_one()
+        content = base64.b64decode(self.file)
+        if (self.filename or '').lower().endswith('.xlsx'):
+            if openpyxl is None:
+                raise UserError(_('Reading XLSX files requires the openpyxl library. Please upload a CSV file.'))
+            sheet = openpyxl.load_workbook(io.BytesIO(content), read_only=True, data_only=True).active
+            rows = sheet.iter_rows(values_only=True)
+        else:
+            text = content.decode('utf-8-sig')
+            try:
+                dialect = csv.Sniffer().sniff(text[:4096], delimiters=',;\t')
+            except csv.Error:
+                dialect = csv.excel
+            rows = csv.reader(io.StringIO(text), dialect)
+        header = next(rows, None)
+        if not header:
+            raise UserError(_('The file is empty.'))
+        header = [str(col or '').strip().lower() for col in header]
+        if 'name' not in header or 'email' not in header:
+            raise UserError(_('The file must contain a "name" and an "email" column.'))
+        return [dict(zip(header, row)) for row in rows if any(cell not in (None, '') for cell in row)]
+
+    @api.model
+    def _prepare_yellow_values(self, row):
+        vals = {}
+        for fname in IMPORT_TEXT_FIELDS:
+            if row.get(fname) not in (None, ''):
+                vals[fname] = str(row[fname]).strip()
+        for fname in IMPORT_DATE_FIELDS:
+            if row.get(fname) not in (None, ''):
+                vals[fname] = fields.Date.to_date(row[fname] if not isinstance(row[fname], str) else row[fname].strip())
+        return vals
+
+    def _create_agreements(self, rows, partner_by_email):
+        """Create the contacts missing for ``rows``, then their agreements and
+        portal users. Return the agreements, in the order of ``rows``, and the
+        created contacts."""
+        Partner = self.env['res.partner']
+        missing = [(line, email) for line, email, _yellow in rows if email not in partner_by_email]
+        new_partners = Partner.create([{'name': line['name'], 'email': email} for line, email in missing])
+        partners = dict(partner_by_email, **dict(zip([email for _line, email in missing], new_partners)))
+        agreements = self.env['learning.agreement'].with_context(tracking_disable=True).create([dict(
+            yellow,
+            student_partner_id=partners[email].id,
+            student_full_name=line['name'],
+            student_email=email,
+        ) for line, email, yellow in rows])
+        if self.invite_to_portal:
+            agreements._invite_students_to_portal()
+        return agreements, new_partners
+
+    def action_import(self):
+        self.ensure_one()
+        Partner = self.env['res.partner']
+        Agreement = self.env['learning.agreement'].with_context(tracking_disable=True)
+
+        lines = []
+        valid_rows = []
+        seen = set()
+        for index, row in enumerate(self._read_rows(), start=2):
+            name = str(row.get('name') or '').strip()
+            raw_email = str(row.get('email') or '').strip()
+            email = email_normalize(raw_email)
+            line = {'row': index, 'name': name, 'email': raw_email}
+            if not name or not email:
+                lines.append(dict(line, status='error', message=_('A name and a valid email are required.')))
+                continue
+            if email in seen:
+                lines.append(dict(line, status='error', message=_('Duplicate email in the file.')))
+                continue
+            try:
+                yellow = self._prepare_yellow_values(row)
+            except (ValueError, TypeError) as e:
+                lines.append(dict(line, status='error', message=_('Invalid value: %s', e)))
+                continue
+            seen.add(email)
+            valid_rows.append((line, email, yellow))
+
+        # Deduplicate against existing users and partners in one query each
+        emails = [email for _line, email, _yellow in valid_rows]
+        users = self.env['res.users'].sudo().with_context(active_test=False).search([('login', 'in', emails)])
+        user_by_login = {user.login: user for user in users}
+        partner_by_email = {user.login: user.partner_id for user in users}
+        for partner in Partner.search([('email_normalized', 'in', emails)], order='id'):
+            partner_by_email.setdefault(partner.email_normalized, partner)
+
+        if self.invite_to_portal:
+            # Rows that cannot get a portal user would fail the whole batch
+            rows = []
+            for line, email, yellow in valid_rows:
+                partner = partner_by_email.get(email, Partner).sudo().with_context(active_test=False)
+                linked = partner.user_ids | user_by_login.get(email, users.browse())
+                if linked.filtered(lambda u: not u.active):
+                    lines.append(dict(line, status='error', message=_('This email belongs to an archived user.')))
+                elif linked.filtered(lambda u: not u.share):
+                    lines.append(dict(line, status='error', message=_('This email belongs to an internal user.')))
+                else:
+                    rows.append((line, email, yellow))
+            valid_rows = rows
+
+        try:
+            with self.env.cr.savepoint():
+                agreements, new_partners = self._create_agreements(valid_rows, partner_by_email)
+            imported = list(zip(valid_rows, agreements))
+        except Exception:
+            # Find the offending rows by importing them one by one
+            _logger.info('Batch import of %s students failed, importing row by row', len(valid_rows), exc_info=True)
+            agreements, new_partners, imported = Agreement, Partner, []
+            for row in valid_rows:
+                try:
+                    with self.env.cr.savepoint():
+                        agreement, new_partner = self._create_agreements([row], partner_by_email)
+                except Exception as e:
+                    lines.append(dict(row[0], status='error', message=_('Could not import this row: %s', e)))
+                    continue
+                agreements |= agreement
+                new_partners |= new_partner
+                imported.append((row, agreement))
+
+        template = self.env.ref('sm_learning_agreement.mail_student_form_invite', raise_if_not_found=False)
+        if self.send_form_link and template and agreements:
+            template.send_mail_batch(agreements.ids, force_send=False)
+
+        for (line, _email, _yellow), agreement in imported:
+            existing = agreement.student_partner_id not in new_partners
+            lines.append(dict(
+                line,
+                status='done',
+                agreement_id=agreement.id,
+                message=_('Agreement created for an existing contact.') if existing else _('Contact and agreement created.'),
+            ))
+        lines.sort(key=lambda line: line['row'])
+        self.write({
+            'state': 'done',
+            'line_ids': [(5, 0, 0)] + [(0, 0, line) for line in lines],
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+
+class LearningAgreementImportLine(models.TransientModel):
+    _name = 'learning.agreement.import.line'
+    _description = 'Learning Agreement Student Import Line'
+    _order = 'row'
+
+    wizard_id = fields.Many2one('learning.agreement.import', required=True, ondelete='cascade')
+    row = fields.Integer(string='Row')
+    name = fields.Char(string='Name')
+    email = fields.Char(string='Email')
+    status = fields.Selection([('done', 'Imported'), ('error', 'Error')], string='Status')
+    message = fields.Char(string='Message')
+    agreement_id = fields.Many2one('learning.agreement', string='Agreement')